@@ -45,15 +45,18 @@ class HINGE(nn.Module):
         x = conv_layer(x)  # shape: (batch, nf, 1, embedding_dim-2)
         x = F.relu(x)
         x = x.squeeze(2)   # shape: (batch, nf, embedding_dim-2)
-        x = x.view(x.size(0), -1)  # flatten to (batch, nf*(embedding_dim-2))
+        x = x.flatten(1)  # flatten to (batch, nf*(embedding_dim-2))
         return x
 
-    def forward(self, h, r, t, key_value_pairs=None):
+    def forward(self, h, r, t, key_value_pairs=None, mask=None):
         """
         Forward pass.
         h, r, t: indices for the head, base relation, and tail.
         key_value_pairs: Optional tensor of shape (batch, n, 2) with (k, v) indices.
         If None, the model treats the fact as a triple fact.
+        mask: Optional bool tensor of shape (batch, n) marking the real (k, v) pairs,
+        so facts of different arity can share a batch (padding rows are ignored).
+        If None, every pair is real.
         Returns: predicted score (lower is better) for the fact.
         """
         # Embed the base triplet.
@@ -66,26 +69,29 @@ class HINGE(nn.Module):
         triplet_feature = self.conv_branch(triplet_input, self.triplet_conv)  # (batch, nf*(embedding_dim-2))
         
         # If no key-value pairs are provided, use only the base triplet.
-        if key_value_pairs is None:
+        if key_value_pairs is None or key_value_pairs.size(1) == 0:
             merged_feature = triplet_feature
         else:
             # key_value_pairs: shape (batch, n, 2)
-            batch_size, num_pairs, _ = key_value_pairs.size()
+            if mask is None:
+                mask = torch.ones(key_value_pairs.shape[:2], dtype=torch.bool, device=key_value_pairs.device)
+            # Only the real pairs are convolved: (p,) fact and pair indices, p = mask.sum()
+            fact_idx, pair_idx = mask.nonzero(as_tuple=True)
+            pairs = key_value_pairs[fact_idx, pair_idx]  # (p, 2)
             # Get embeddings for keys (relations) and values (entities)
-            keys = key_value_pairs[:, :, 0]  # (batch, n)
-            values = key_value_pairs[:, :, 1]  # (batch, n)
-            key_emb = self.rel_emb(keys)       # (batch, n, embedding_dim)
-            value_emb = self.ent_emb(values)   # (batch, n, embedding_dim)
+            key_emb = self.rel_emb(pairs[:, 0])    # (p, embedding_dim)
+            value_emb = self.ent_emb(pairs[:, 1])  # (p, embedding_dim)
             
-            # Expand base triplet embeddings to (batch, n, embedding_dim)
-            h_exp = h_emb.unsqueeze(1).expand(-1, num_pairs, -1)
-            r_exp = r_emb.unsqueeze(1).expand(-1, num_pairs, -1)
-            t_exp = t_emb.unsqueeze(1).expand(-1, num_pairs, -1)
+            # Stack to form quintuple: [h, r, t, k, v] of shape (p, 5, embedding_dim),
+            # with each pair's own fact's base triplet
+            quintuple_input = torch.stack([h_emb[fact_idx], r_emb[fact_idx], t_emb[fact_idx], key_emb, value_emb], dim=1)
+            quintuple_feature = self.conv_branch(quintuple_input, self.quintuple_conv)  # (p, nf*(embedding_dim-2))
             
-            # Stack to form quintuple: [h, r, t, k, v] of shape (batch, n, 5, embedding_dim)
-            quintuple_input = torch.stack([h_exp, r_exp, t_exp, key_emb, value_emb], dim=2)
-            # Reshape to (batch*n, 5, embedding_dim)
-            quintuple_input = quintuple_input.view(-1, 5, self.embedding_dim)
-            quintuple_feature = self.conv_branch(quintuple_input, self.quintuple_conv)
-            # Reshape back to (batch, n, nf*(embedding_dim-2))
-            quintuple_feature = quintuple_feature.view(batch_size, num_pairs, -
+            # Merge by elementwise min over the triplet and each fact's own quintuples:
+            # every pair's feature is min-reduced into its fact's row.
+            index = fact_idx.unsqueeze(1).expand_as(quintuple_feature)
+            merged_feature = triplet_feature.scatter_reduce(0, index, quintuple_feature, reduce="amin", include_self=True)
+        
+        # Final score
+        score = self.fc(merged_feature)  # (batch, 1)
+        return score
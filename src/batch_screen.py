@@ -0,0 +1,237 @@
+import os
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from fact_table import FactTable, regimen_pairs
+from pair_index import load_pair_index
+
+# Regimens handed to a worker at a time
+SCREEN_CHUNK_SIZE = 5_000
+# Pair results a worker keeps between chunks (popular pairs recur across patients)
+WORKER_PAIR_CACHE_SIZE = 1_000_000
+
+def read_regimens(path):
+    """
+    Streams (regimen ID, drug list) from an NDJSON file with one regimen per line,
+    e.g. {"id": "patient-1", "drugs": ["Temazepam", "sildenafil"]}. Lines that are
+    plain JSON lists of drugs get their line number as ID.
+    """
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            regimen = json.loads(line)
+            if isinstance(regimen, list):
+                yield line_number, regimen
+            else:
+                yield regimen["id"], regimen["drugs"]
+
+class RegimenScreener:
+    """
+    Screens batches of regimens against a pair index (see pair_index.py). Each
+    distinct drug pair in a batch is looked up once, whatever the number of
+    regimens it appears in, and its decoded top-k is kept in a bounded cache so
+    later batches reuse it too.
+    """
+    def __init__(self, index_path, k, cache_size=WORKER_PAIR_CACHE_SIZE):
+        self.index = load_pair_index(index_path)
+        if self.index.max_k is not None and k > self.index.max_k:
+            raise ValueError(f"k={k} exceeds the max_k={self.index.max_k} the index was built with.")
+        self.k = k
+        self.cache_size = cache_size
+        self.cache = {}  # (d1, d2) -> [(condition, PRR), ...]
+
+    def lookup(self, pairs):
+        """
+        Top-k (condition, PRR) of each distinct pair, reading the index only for
+        uncached pairs, all in one vectorized pass (PairIndex.pair_ranges).
+        """
+        pairs = list(dict.fromkeys(pairs))
+        missing = [pair for pair in pairs if pair not in self.cache]
+        if len(self.cache) + len(missing) > self.cache_size:
+            self.cache = {}
+            missing = pairs
+        if not missing:
+            return 0
+        name2id = self.index.name2id
+        lo, hi = self.index.pair_ranges([name2id.get(d1, -1) for d1, _ in missing],
+                                        [name2id.get(d2, -1) for _, d2 in missing])
+        # The first k records of every pair, decoded together
+        counts = np.minimum(hi - lo, self.k)
+        offsets = np.zeros(len(missing) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        rows = np.repeat(lo - offsets[:-1], counts) + np.arange(offsets[-1])
+        records = list(zip(self.index.entity_names[self.index.conditions[rows]].tolist(),
+                           FactTable.prr_list(self.index.prr[rows])))
+        offsets = offsets.tolist()
+        for i, pair in enumerate(missing):
+            self.cache[pair] = records[offsets[i]:offsets[i + 1]]
+        return len(missing)
+
+    def screen(self, regimens):
+        """
+        Screens a list of (regimen ID, drug list). Returns the results as
+        [(regimen ID, [(d1, d2, condition, PRR), ...]), ...], each regimen's
+        interactions grouped per pair as in PairIndex.query, together with the
+        number of pair occurrences and of index lookups.
+        """
+        pairs_per_regimen = [regimen_pairs(drugs) for _, drugs in regimens]
+        num_pairs = sum(map(len, pairs_per_regimen))
+        num_lookups = self.lookup(pair for pairs in pairs_per_regimen for pair in pairs)
+        cache = self.cache
+        results = [(regimen_id, [(d1, d2, condition, prr) for d1, d2 in pairs for condition, prr in cache[(d1, d2)]])
+                   for (regimen_id, _), pairs in zip(regimens, pairs_per_regimen)]
+        return results, num_pairs, num_lookups
+
+# One screener per worker process. The index arrays are memory-mapped, so every
+# worker shares the same pages through the OS page cache.
+_worker_screener = None
+
+def _init_worker(index_path, k):
+    global _worker_screener
+    _worker_screener = RegimenScreener(index_path, k)
+
+def _screen_chunk(regimens):
+    return _worker_screener.screen(regimens)
+
+def _chunks(regimens, chunk_size):
+    chunk = []
+    for regimen in regimens:
+        chunk.append(regimen)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_screen_results(regimens, index_path, k=5, workers=4, chunk_size=SCREEN_CHUNK_SIZE, stats=None):
+    """
+    Screens a stream of (regimen ID, drug list), yielding per-chunk results
+    (see RegimenScreener.screen) in input order. With workers > 1 the chunks are
+    spread over a process pool, with at most two chunks per worker in flight so
+    the input is streamed rather than read all at once.
+
+    :param stats: Optional dict that pair occurrence and lookup counts are added to.
+    """
+    def record(chunk_result):
+        results, num_pairs, num_lookups = chunk_result
+        if stats is not None:
+            stats["pairs"] = stats.get("pairs", 0) + num_pairs
+            stats["lookups"] = stats.get("lookups", 0) + num_lookups
+        return results
+
+    if workers <= 1:
+        screener = RegimenScreener(index_path, k)
+        for chunk in _chunks(regimens, chunk_size):
+            yield record(screener.screen(chunk))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index_path, k)) as pool:
+        in_flight = deque()
+        for chunk in _chunks(regimens, chunk_size):
+            in_flight.append(pool.submit(_screen_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                yield record(in_flight.popleft().result())
+        while in_flight:
+            yield record(in_flight.popleft().result())
+
+class NdjsonResultWriter:
+    """One line per regimen: {"id": ..., "interactions": [{"drug1", "drug2", "condition", "PRR"}, ...]}."""
+    def __init__(self, path):
+        self.f = open(path, "w")
+
+    def write(self, results):
+        self.f.writelines(
+            json.dumps({"id": regimen_id,
+                        "interactions": [{"drug1": d1, "drug2": d2, "condition": condition, "PRR": prr}
+                                         for d1, d2, condition, prr in interactions]}) + "\n"
+            for regimen_id, interactions in results)
+
+    def close(self):
+        self.f.close()
+
+class ParquetResultWriter:
+    """One row per interaction (id, drug1, drug2, condition, PRR), one row group per chunk. Needs pyarrow."""
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Writing Parquet results requires pyarrow (pip install pyarrow).")
+        self.pa = pa
+        self.path = path
+        self.pq = pq
+        self.writer = None
+
+    def write(self, results):
+        rows = [(regimen_id, *interaction) for regimen_id, interactions in results for interaction in interactions]
+        ids, drug1, drug2, conditions, prrs = zip(*rows) if rows else ([],) * 5
+        table = self.pa.table({
+            "id": self.pa.array([str(regimen_id) for regimen_id in ids], type=self.pa.string()),
+            "drug1": self.pa.array(drug1, type=self.pa.string()),
+            "drug2": self.pa.array(drug2, type=self.pa.string()),
+            "condition": self.pa.array(conditions, type=self.pa.string()),
+            "PRR": self.pa.array(prrs, type=self.pa.float64()),
+        })
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is None:
+            self.write([])  # still leave a valid (empty) file
+        self.writer.close()
+
+RESULT_WRITERS = {"ndjson": NdjsonResultWriter, "parquet": ParquetResultWriter}
+
+def screen_regimens(regimens, index_path, output_path, k=5, workers=4, chunk_size=SCREEN_CHUNK_SIZE,
+                    output_format=None):
+    """
+    Batch-screens many regimens (e.g. a whole patient population) for the top-k
+    riskiest interactions of each of their drug pairs, and streams the results to
+    output_path. Reports throughput in regimens/sec.
+
+    :param regimens: Iterable of (regimen ID, drug list), or an NDJSON file path (see read_regimens).
+    :param index_path: Pair index directory (see pair_index.py), e.g. graph/pair_index/.
+    :param output_path: Results file (.ndjson/.jsonl or .parquet).
+    :param k: Interactions returned per drug pair (at most the index's max_k).
+    :param workers: Worker processes (1 screens in this process).
+    :param chunk_size: Regimens per chunk handed to a worker.
+    :param output_format: "ndjson" or "parquet" (None infers it from output_path).
+    :return: Dictionary of throughput statistics.
+    """
+    if isinstance(regimens, str):
+        regimens = read_regimens(regimens)
+    if output_format is None:
+        output_format = "parquet" if output_path.endswith(".parquet") else "ndjson"
+    if output_format not in RESULT_WRITERS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    stats = {"regimens": 0, "pairs": 0, "lookups": 0}
+    start = time.perf_counter()
+    writer = RESULT_WRITERS[output_format](output_path + ".tmp")
+    try:
+        for results in iter_screen_results(regimens, index_path, k, workers, chunk_size, stats):
+            writer.write(results)
+            stats["regimens"] += len(results)
+    finally:
+        writer.close()
+    os.replace(output_path + ".tmp", output_path)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["regimens_per_sec"] = stats["regimens"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    print(f"Screened {stats['regimens']} regimens ({stats['pairs']} drug pairs, {stats['lookups']} index lookups) "
+          f"in {stats['seconds']:.1f}s: {stats['regimens_per_sec']:,.0f} regimens/sec. Results saved to '{output_path}'.")
+    return stats
+
+# Example usage
+if __name__ == "__main__":
+    regimens_path = "./output/test/regimens.ndjson"  # {"id": ..., "drugs": [...]} per line
+    index_path = "./output/test/graph/pair_index/"
+
+    screen_regimens(regimens_path, index_path, "./output/test/screening/risks.ndjson", k=5, workers=4)
+    # screen_regimens(regimens_path, index_path, "./output/test/screening/risks.parquet", k=5, workers=4)
@@ -0,0 +1,57 @@
+import os
+import time
+import tempfile
+import numpy as np
+import networkx as nx
+
+from graph_snapshot import build_multigraph, save_graph_snapshot
+from networkx_insert import save_multigraph
+from query_engine import load_multigraph
+
+def make_fact_columns(num_edges, num_drugs=4000, num_conditions=10000, seed=0):
+    """Synthetic fact columns (names and PRR) shaped like TWOSIDES."""
+    rng = np.random.default_rng(seed)
+    drug_names = np.array([f"Drug {i}" for i in range(num_drugs)], dtype=object)
+    condition_names = np.array([f"Condition {i}" for i in range(num_conditions)], dtype=object)
+    return (drug_names[rng.integers(0, num_drugs, num_edges)],
+            drug_names[rng.integers(0, num_drugs, num_edges)],
+            condition_names[rng.integers(0, num_conditions, num_edges)],
+            np.round(rng.lognormal(1.0, 1.0, num_edges), 4))
+
+def add_edge_per_fact(drug1, drug2, adverse_event, prr):
+    """The previous build path: one G.add_edge call per fact."""
+    G = nx.MultiGraph()
+    for d1, d2, event, prr_value in zip(drug1.tolist(), drug2.tolist(), adverse_event.tolist(), prr.tolist()):
+        G.add_edge(d1, d2, adverseEvent=event, PRR=prr_value)
+    return G
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def benchmark(num_edges):
+    print(f"\n{num_edges:,} edges")
+    columns = make_fact_columns(num_edges)
+    _, elapsed = timed(add_edge_per_fact, *columns)
+    print(f"  build, add_edge per fact: {elapsed:.1f}s")
+    G, elapsed = timed(build_multigraph, *columns)
+    print(f"  build, build_multigraph: {elapsed:.1f}s")
+    del columns
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = os.path.join(tmp_dir, "polypharmacy_multigraph.json")
+        snapshot_path = os.path.join(tmp_dir, "polypharmacy_multigraph.npz")
+        for name, path, save in [("node-link JSON", json_path, lambda: save_multigraph(G, tmp_dir)),
+                                 ("binary snapshot", snapshot_path, lambda: save_graph_snapshot(G, snapshot_path))]:
+            _, save_time = timed(save)
+            loaded, load_time = timed(load_multigraph, path)
+            assert loaded.number_of_edges() == G.number_of_edges()
+            del loaded
+            print(f"  {name:>15}: {os.path.getsize(path) / 2**20:,.1f} MiB, "
+                  f"saved in {save_time:.1f}s, loaded in {load_time:.1f}s")
+
+if __name__ == "__main__":
+    # 10M edges needs a machine with plenty of memory (tens of GB) for the MultiGraph
+    for num_edges in [1_000_000, 10_000_000]:
+        benchmark(num_edges)
@@ -0,0 +1,177 @@
+import os
+import time
+import threading
+
+from neo4j_insert import (GRAPH_MODELS, create_database_if_not_exists, create_schema, insert_hyperfacts,
+                          insert_hyperfacts_concurrent, iter_fact_rows, load_hyperfacts)
+
+class RecordingDriver:
+    """
+    Local stand-in for a neo4j Driver that records the queries it is sent
+    instead of talking to a server. Every run() and commit() counts as one
+    round trip, as it would over Bolt.
+    """
+    def __init__(self):
+        self.round_trips = 0
+        self.queries = []  # (database, query, parameters)
+        self.lock = threading.Lock()  # sessions may be used from several threads
+
+    def session(self, database=None, **config):
+        return RecordingSession(self, database)
+
+    def close(self):
+        pass
+
+class RecordingSession:
+    def __init__(self, driver, database):
+        self.driver = driver
+        self.database = database
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwparameters):
+        with self.driver.lock:
+            self.driver.round_trips += 1
+            self.driver.queries.append((self.database, query, {**(parameters or {}), **kwparameters}))
+
+    def begin_transaction(self):
+        return RecordingTransaction(self)
+
+class RecordingTransaction:
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def run(self, query, parameters=None, **kwparameters):
+        self.session.run(query, parameters, **kwparameters)
+
+    def commit(self):
+        with self.session.driver.lock:
+            self.session.driver.round_trips += 1
+
+def make_hyperfacts(num_facts, num_drugs=500, num_conditions=2000):
+    """Synthetic facts in the hyperfacts.json format."""
+    return [{
+        "drug1": f"Drug {i % num_drugs}",
+        "relation": "interactWith",
+        "drug2": f"Drug {(i * 7 + 1) % num_drugs}",
+        "attributes": {"adverseEvent": f"Condition {i % num_conditions}", "PRR": 1.0 + i % 97},
+    } for i in range(num_facts)]
+
+def per_fact_insert(driver, db_name, hyperfacts):
+    """The previous path: one auto-commit four-MERGE query per fact."""
+    with driver.session(database=db_name) as session:
+        for fact in hyperfacts:
+            session.run("""
+            MERGE (d1:Drug {name: $drug1})
+            MERGE (d2:Drug {name: $drug2})
+            MERGE (d1)-[r:INTERACT_WITH {adverseEvent: $adverse_event, PRR: $prr_value}]->(d2)
+            MERGE (d2)-[r2:INTERACT_WITH {adverseEvent: $adverse_event, PRR: $prr_value}]->(d1)
+            RETURN d1, d2, r, r2
+            """, drug1=fact["drug1"], drug2=fact["drug2"],
+                adverse_event=fact["attributes"]["adverseEvent"], prr_value=fact["attributes"]["PRR"])
+
+def count_round_trips(num_facts, batch_size, workers=4):
+    hyperfacts = make_hyperfacts(num_facts)
+    for name, insert in [("per-fact", per_fact_insert),
+                         ("batched", lambda driver, db, facts: insert_hyperfacts(driver, db, facts, batch_size)),
+                         ("concurrent", lambda driver, db, facts: insert_hyperfacts_concurrent(
+                             driver, db, facts, workers, batch_size))]:
+        driver = RecordingDriver()
+        start = time.perf_counter()
+        insert(driver, "bench", hyperfacts)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {num_facts} facts -> {driver.round_trips} round trips "
+              f"({elapsed:.2f}s client-side)")
+
+# Record sizes of Neo4j's standard store format, for a rough size estimate: a
+# property record holds up to 4 (short) properties.
+NODE_RECORD_BYTES = 15
+RELATIONSHIP_RECORD_BYTES = 34
+PROPERTY_RECORD_BYTES = 41
+
+def model_footprint(hyperfacts, model):
+    """
+    Nodes, relationships and properties each graph model stores for these facts
+    (after MERGE has collapsed repeats), with an estimated store size in bytes.
+    """
+    drugs, conditions, pairs, facts = set(), set(), set(), set()
+    for drug1, drug2, adverse_event, prr_value in iter_fact_rows(hyperfacts):
+        drugs.update((drug1, drug2))
+        conditions.add(adverse_event)
+        pair = (drug1, drug2) if drug1 <= drug2 else (drug2, drug1)
+        pairs.add(pair)
+        facts.add((pair, adverse_event, prr_value))
+    if model == "bidirectional":
+        # MERGE on the full property map: one pair of relationships per distinct (pair, condition, PRR)
+        nodes, relationships = len(drugs), 2 * len(facts)
+        property_records = len(drugs) + relationships
+    elif model == "single":
+        # One relationship per distinct (pair, condition)
+        nodes, relationships = len(drugs), len({(pair, condition) for pair, condition, _ in facts})
+        property_records = len(drugs) + relationships
+    else:
+        causes = len({(pair, condition) for pair, condition, _ in facts})
+        nodes = len(drugs) + len(conditions) + len(pairs)
+        relationships = sum(2 if a != b else 1 for a, b in pairs) + causes
+        property_records = nodes + causes
+    size = (nodes * NODE_RECORD_BYTES + relationships * RELATIONSHIP_RECORD_BYTES
+            + property_records * PROPERTY_RECORD_BYTES)
+    return {"nodes": nodes, "relationships": relationships, "estimated_bytes": size}
+
+def compare_model_footprints(hyperfacts_path):
+    hyperfacts = load_hyperfacts(hyperfacts_path)
+    for model in GRAPH_MODELS:
+        footprint = model_footprint(hyperfacts, model)
+        print(f"{model:>13}: {footprint['nodes']} nodes, {footprint['relationships']} relationships, "
+              f"~{footprint['estimated_bytes'] / 2**20:.1f} MiB")
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def benchmark_models(driver, hyperfacts_path, batch_size=10_000, workers=1, databases_dir=None):
+    """
+    Loads the facts into one fresh database per graph model (bench<model>, which
+    needs Neo4j Enterprise) and reports load time, node/relationship counts and,
+    if databases_dir (e.g. $NEO4J_HOME/data/databases) is given, the store size on disk.
+    """
+    hyperfacts = load_hyperfacts(hyperfacts_path)
+    for model in GRAPH_MODELS:
+        db_name = f"bench{model}"
+        create_database_if_not_exists(driver, db_name)
+        create_schema(driver, db_name, model)
+        start = time.perf_counter()
+        if workers > 1:
+            insert_hyperfacts_concurrent(driver, db_name, hyperfacts, workers, batch_size, model=model)
+        else:
+            insert_hyperfacts(driver, db_name, hyperfacts, batch_size, model=model)
+        elapsed = time.perf_counter() - start
+        with driver.session(database=db_name) as session:
+            nodes = session.run("MATCH (n) RETURN count(n) AS count").single()["count"]
+            relationships = session.run("MATCH ()-[r]->() RETURN count(r) AS count").single()["count"]
+        report = f"{model:>13}: loaded in {elapsed:.1f}s, {nodes} nodes, {relationships} relationships"
+        if databases_dir:
+            report += f", {directory_size(os.path.join(databases_dir, db_name)) / 2**20:.1f} MiB on disk"
+        print(report)
+
+if __name__ == "__main__":
+    count_round_trips(100_000, batch_size=10_000)
+    compare_model_footprints("./output/test/hyperfacts.json")
+
+    # Against a running Neo4j Enterprise server:
+    # from neo4j import GraphDatabase
+    # from neo4j_insert import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    # with GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) as driver:
+    #     benchmark_models(driver, "./output/test/hyperfacts.json", databases_dir="/var/lib/neo4j/data/databases")
@@ -0,0 +1,48 @@
+import os
+import time
+import tempfile
+import numpy as np
+
+from batch_screen import screen_regimens
+from fact_table import FactTable
+from pair_index import load_pair_index, write_pair_index
+
+def make_fact_table(num_facts, num_drugs=4000, num_conditions=10000, seed=0):
+    """Synthetic FactTable shaped like TWOSIDES."""
+    rng = np.random.default_rng(seed)
+    names = [f"Drug {i}" for i in range(num_drugs)] + [f"Condition {i}" for i in range(num_conditions)]
+    return FactTable(rng.integers(0, num_drugs, num_facts), rng.integers(0, num_drugs, num_facts),
+                     rng.integers(num_drugs, num_drugs + num_conditions, num_facts),
+                     rng.lognormal(1.0, 1.0, num_facts), names)
+
+def make_regimens(num_regimens, num_drugs=4000, seed=1):
+    """Medication lists of 2-12 drugs, with Zipf-distributed drug popularity like real prescriptions."""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, num_drugs + 1)
+    popularity /= popularity.sum()
+    return [(f"patient-{i}", [f"Drug {d}" for d in rng.choice(num_drugs, rng.integers(2, 13), p=popularity)])
+            for i in range(num_regimens)]
+
+def per_regimen_queries(index, regimens, k):
+    """The previous path: one query per patient, every pair looked up again."""
+    return [(regimen_id, index.query(drugs, k)) for regimen_id, drugs in regimens]
+
+def benchmark(num_facts=2_000_000, num_regimens=100_000, k=5):
+    print(f"\n{num_facts:,} facts, {num_regimens:,} regimens, k={k}")
+    regimens = make_regimens(num_regimens)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_path = os.path.join(tmp_dir, "pair_index")
+        write_pair_index(make_fact_table(num_facts), index_path, max_k=100)
+
+        start = time.perf_counter()
+        per_regimen_queries(load_pair_index(index_path), regimens, k)
+        elapsed = time.perf_counter() - start
+        print(f"  one query per regimen: {num_regimens / elapsed:,.0f} regimens/sec")
+
+        for workers in sorted({1, os.cpu_count() or 1}):
+            for output_format in ["ndjson", "parquet"]:
+                print(f"  batch screening, {workers} worker(s), {output_format}:")
+                screen_regimens(regimens, index_path, os.path.join(tmp_dir, f"risks.{output_format}"), k, workers)
+
+if __name__ == "__main__":
+    benchmark()
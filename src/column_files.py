@@ -0,0 +1,81 @@
+import os
+import json
+import numpy as np
+
+# Shared on-disk conventions of the column-file directories: the columnar
+# hyperfacts store (fact_store.py), the pair index (pair_index.py) and the
+# condition index (condition_index.py). Each is a directory of
+#   meta.json   - format name/version, sizes and column dtypes. It is removed
+#                 before anything else is written and written last, so a
+#                 directory without it is incomplete.
+#   <name>.bin  - one raw little-endian array per column
+#   <name>.json - side tables such as entity names
+# Loading memory-maps the .bin files, so only the pages a lookup touches are
+# read, and processes that open the same directory share them through the OS
+# page cache.
+
+def is_complete(path):
+    """True if `path` is a complete column-file directory (it has a meta.json)."""
+    return os.path.isfile(os.path.join(path, "meta.json"))
+
+def begin_write(path):
+    """Creates the directory `path`, invalidating any previous contents until write_meta."""
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, "meta.json")):
+        os.remove(os.path.join(path, "meta.json"))
+
+def write_columns(path, columns, dtypes):
+    """Writes each array of `columns` as `<name>.bin`, converted to dtypes[name]."""
+    # Each file is replaced rather than rewritten, so processes that still have
+    # the old files mapped keep reading the old data.
+    for name, values in columns.items():
+        file_path = os.path.join(path, f"{name}.bin")
+        np.asarray(values).astype(dtypes[name]).tofile(file_path + ".tmp")
+        os.replace(file_path + ".tmp", file_path)
+
+def write_json(path, name, values):
+    """Writes a side table as `<name>.json`."""
+    file_path = os.path.join(path, f"{name}.json")
+    with open(file_path + ".tmp", "w") as f:
+        json.dump(values, f)
+    os.replace(file_path + ".tmp", file_path)
+
+def write_meta(path, meta):
+    """Writes meta.json, which marks the directory as complete; call it last."""
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=4)
+    os.replace(meta_path + ".tmp", meta_path)
+
+def read_meta(path, kind, format_name, version):
+    """Reads meta.json, checking that `path` holds a `kind` of the given format and version."""
+    with open(os.path.join(path, "meta.json"), "r") as f:
+        meta = json.load(f)
+    if meta.get("format") != format_name or meta.get("version") != version:
+        raise ValueError(f"Unsupported {kind} in '{path}': {meta.get('format')} v{meta.get('version')}")
+    return meta
+
+def read_json(path, name):
+    """Reads the side table `<name>.json`."""
+    with open(os.path.join(path, f"{name}.json"), "r") as f:
+        return json.load(f)
+
+def map_columns(path, dtypes, sizes, mmap=True):
+    """
+    Opens the columns `<name>.bin` of the given dtypes and lengths, as read-only
+    views of memory-mapped files (or, with mmap=False, read into memory).
+    Returns {name: array}.
+    """
+    columns = {}
+    for name, dtype in dtypes.items():
+        file_path = os.path.join(path, f"{name}.bin")
+        if sizes[name] == 0:
+            values = np.empty(0, dtype=dtype)
+        elif mmap:
+            values = np.memmap(file_path, dtype=dtype, mode="r", shape=(sizes[name],))
+            # Plain ndarray view of the same pages: slicing a memmap is much slower
+            values = values.view(np.ndarray)
+        else:
+            values = np.fromfile(file_path, dtype=dtype, count=sizes[name])
+        columns[name] = values
+    return columns
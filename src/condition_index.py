@@ -0,0 +1,204 @@
+import json
+import time
+import numpy as np
+
+import column_files
+from fact_table import FactTable, load_fact_table
+
+# On-disk layout of a condition index (a directory, e.g. output/test/graph/condition_index/),
+# the inverse of the pair index: for each condition, the drug pairs reported with it.
+#   meta.json          - format name/version, sizes and column dtypes
+#   entities.json      - entity names; drugs are indices into this list
+#   conditions.json    - the indexed condition names, in index order
+#   condition_offsets.bin - pairs of the i-th condition are
+#                        drug1/drug2/prr[condition_offsets[i]:condition_offsets[i + 1]]
+#   drug1.bin, drug2.bin, prr.bin - the (drug1, drug2, PRR) records, by descending PRR
+#                        within each condition; drug1's name sorts before drug2's
+# Like the pair index, the files follow column_files.py: the columns are
+# memory-mapped when loading, so a lookup reads only its condition's block and a
+# PRR threshold is a binary search within it.
+INDEX_FORMAT = "polypharmacy-condition-index"
+INDEX_VERSION = 1
+INDEX_DTYPES = {
+    "condition_offsets": "<i8",
+    "drug1": "<i4",
+    "drug2": "<i4",
+    "prr": "<f4",
+}
+
+def write_condition_index(table, path, conditions=None):
+    """
+    Writes the condition index of a FactTable (see fact_table.py) to the directory `path`.
+
+    :param conditions: Condition names to index, e.g. the contents of conditions.json.
+                       Conditions without facts get an empty list. By default every
+                       condition that has facts is indexed.
+    """
+    column_files.begin_write(path)
+
+    counts = np.diff(table.condition_offsets)
+    if conditions is None:
+        codes = np.flatnonzero(counts)
+    else:
+        codes = np.array([table.entity_id(name) for name in conditions], dtype=np.int64)
+    known = codes >= 0
+    condition_names = [str(name) for name in (table.names(codes) if conditions is None else conditions)]
+
+    # Gather each condition's block of the table's by-condition layout, which is
+    # already sorted by descending PRR within a condition
+    block_counts = np.where(known, counts[np.where(known, codes, 0)], 0)
+    condition_offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(block_counts, out=condition_offsets[1:])
+    starts = np.where(known, table.condition_offsets[np.where(known, codes, 0)], 0)
+    rows = np.repeat(starts - condition_offsets[:-1], block_counts) + np.arange(condition_offsets[-1])
+    drug1, drug2 = table.cond_drug1[rows], table.cond_drug2[rows]
+
+    # Put each pair in the (d1, d2) order the query results use
+    rank = np.empty(len(table.entity_names), dtype=np.int64)
+    rank[np.argsort(table.entity_names.astype(str), kind="stable")] = np.arange(len(rank))
+    swap = rank[drug1] > rank[drug2]
+    drug1, drug2 = np.where(swap, drug2, drug1), np.where(swap, drug1, drug2)
+
+    columns = {
+        "condition_offsets": condition_offsets,
+        "drug1": drug1,
+        "drug2": drug2,
+        "prr": table.cond_prr[rows],
+    }
+    column_files.write_columns(path, columns, INDEX_DTYPES)
+    column_files.write_json(path, "entities", table.entity_names.tolist())
+    column_files.write_json(path, "conditions", condition_names)
+
+    meta = {
+        "format": INDEX_FORMAT,
+        "version": INDEX_VERSION,
+        "num_conditions": len(condition_names),
+        "num_records": int(condition_offsets[-1]),
+        "columns": INDEX_DTYPES,
+    }
+    column_files.write_meta(path, meta)
+
+class ConditionIndex:
+    """
+    A memory-mapped condition index written by write_condition_index. Answers
+    "which drug pairs have the highest PRR for this condition?" by slicing the
+    condition's PRR-sorted block, and sweeps every condition in one pass.
+    """
+    def __init__(self, path):
+        meta = column_files.read_meta(path, "condition index", INDEX_FORMAT, INDEX_VERSION)
+        self.path = path
+        self.entity_names = np.array(column_files.read_json(path, "entities"), dtype=object)
+        self.conditions = column_files.read_json(path, "conditions")
+        self.condition2id = {name: i for i, name in enumerate(self.conditions)}
+
+        sizes = {
+            "condition_offsets": meta["num_conditions"] + 1,
+            "drug1": meta["num_records"],
+            "drug2": meta["num_records"],
+            "prr": meta["num_records"],
+        }
+        for name, values in column_files.map_columns(path, meta["columns"], sizes).items():
+            setattr(self, name, values)
+
+    def __len__(self):
+        return len(self.conditions)
+
+    def condition_records(self, condition, k=None, min_prr=None):
+        """
+        (drug1, drug2, prr) views of the pairs reported with `condition`, in
+        descending PRR order: at most k of them, and only those with PRR >= min_prr.
+        """
+        i = self.condition2id.get(condition)
+        if i is None:
+            return self.drug1[:0], self.drug2[:0], self.prr[:0]
+        lo, hi = self.condition_offsets[i], self.condition_offsets[i + 1]
+        if min_prr is not None:
+            # The block is sorted by descending PRR: binary search on its negation
+            hi = lo + np.searchsorted(-self.prr[lo:hi], -np.float32(min_prr), side="right")
+        if k is not None:
+            hi = min(hi, lo + k)
+        return self.drug1[lo:hi], self.drug2[lo:hi], self.prr[lo:hi]
+
+    def query(self, condition, k=None, min_prr=None):
+        """
+        The drug pairs with the highest PRR for `condition`, as a list of
+        (d1, d2, condition, PRR) by descending PRR, with d1 < d2.
+
+        :param k: Return at most k pairs (None for all).
+        :param min_prr: Only return pairs with PRR >= min_prr.
+        """
+        drug1, drug2, prrs = self.condition_records(condition, k, min_prr)
+        return [(d1, d2, condition, prr) for d1, d2, prr in
+                zip(self.entity_names[drug1].tolist(), self.entity_names[drug2].tolist(), FactTable.prr_list(prrs))]
+
+    def sweep(self, k=None, min_prr=None):
+        """
+        query() for every indexed condition at once, as {condition: [(d1, d2, condition, PRR), ...]}
+        for the conditions with at least one matching pair. The cut-offs are applied
+        to all records in a single vectorized pass, so only the kept pairs are decoded.
+        """
+        offsets = self.condition_offsets
+        counts = np.diff(offsets)
+        keep = np.ones(len(self.prr), dtype=bool)
+        if k is not None:
+            keep &= np.arange(len(self.prr)) - np.repeat(offsets[:-1], counts) < k
+        if min_prr is not None:
+            keep &= self.prr >= np.float32(min_prr)
+        rows = np.flatnonzero(keep)
+        # Kept records stay in condition order, so each condition is a contiguous run
+        kept_offsets = np.searchsorted(rows, offsets)
+        drug1 = self.entity_names[self.drug1[rows]].tolist()
+        drug2 = self.entity_names[self.drug2[rows]].tolist()
+        prrs = FactTable.prr_list(self.prr[rows])
+        results = {}
+        for i in np.flatnonzero(np.diff(kept_offsets)).tolist():
+            condition = self.conditions[i]
+            lo, hi = kept_offsets[i], kept_offsets[i + 1]
+            results[condition] = [(d1, d2, condition, prr) for d1, d2, prr in
+                                  zip(drug1[lo:hi], drug2[lo:hi], prrs[lo:hi])]
+        return results
+
+def is_condition_index(path):
+    """True if `path` is a complete condition index directory."""
+    return column_files.is_complete(path)
+
+def load_condition_index(path):
+    """Opens a condition index written by write_condition_index."""
+    return ConditionIndex(path)
+
+def load_conditions(conditions_json):
+    """Condition names from a conditions.json written by extract.py."""
+    with open(conditions_json, "r") as f:
+        return json.load(f)
+
+def build_condition_index(input_path, output_path, conditions_json=None):
+    """
+    Builds a condition index from hyperfacts.json or a columnar hyperfacts store.
+
+    :param input_path: Path to hyperfacts.json or the columnar store directory.
+    :param output_path: Directory to write the index to.
+    :param conditions_json: conditions.json listing the conditions to index
+                            (None indexes every condition that has facts).
+    """
+    table = load_fact_table(input_path)
+    conditions = load_conditions(conditions_json) if conditions_json else None
+    write_condition_index(table, output_path, conditions)
+    print(f"Condition index for {len(table)} facts saved at: {output_path}")
+
+# Example usage
+if __name__ == "__main__":
+    input_path = "./output/test/hyperfacts"  # hyperfacts.json or the columnar store
+    conditions_path = "./output/test/conditions.json"
+    index_path = "./output/test/graph/condition_index/"
+
+    build_condition_index(input_path, index_path, conditions_path)
+    index = load_condition_index(index_path)
+
+    for idx, (drug1, drug2, condition, prr) in enumerate(index.query("Hyponatraemia", k=10), 1):
+        print(f"  {idx}. {drug1} + {drug2} → {condition} (PRR: {prr})")
+
+    # Pharmacovigilance sweep: the strongest signals of every condition
+    start = time.perf_counter()
+    signals = index.sweep(k=20, min_prr=2.0)
+    print(f"Swept {len(index)} conditions ({sum(map(len, signals.values()))} signals) "
+          f"in {time.perf_counter() - start:.2f}s")
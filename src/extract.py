@@ -1,6 +1,22 @@
 import os
-import pandas as pd
 import json
+import shutil
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fact_store import ColumnarHyperfactsWriter, Vocabulary, encode_hyperfacts, prr_to_float, source_ids
+
+# Columns extracted from every TWOSIDES split file
+REQUIRED_COLS = [
+    'drug_1_rxnorm_id', 
+    'drug_1_concept_name', 
+    'drug_2_rxnorm_id', 
+    'drug_2_concept_name', 
+    'condition_meddra_id', 
+    'condition_concept_name',
+    'PRR'  # Added PRR column
+]
 
 def load_checkpoint(checkpoint_path):
     """Load the set of already processed filenames from the checkpoint file."""
@@ -23,11 +39,528 @@ def safe_float(val):
         return 0.0
 
 
-def process_folder(folder_path, output_path):
+def find_column_positions(file_path):
+    """
+    Reads only the header row of the first split file and returns the
+    positions of REQUIRED_COLS, so later (headerless) splits can be read by index.
+    """
+    header_names = pd.read_csv(file_path, nrows=0).columns.tolist()
+    try:
+        return [header_names.index(col) for col in REQUIRED_COLS]
+    except ValueError as ve:
+        raise Exception(f"Required column missing in header of {os.path.basename(file_path)}: {ve}")
+
+def read_required_columns(file_path, col_positions, has_header, chunksize=None):
+    """
+    Reads only the required columns of a split file.
+    Yields DataFrames with columns REQUIRED_COLS: the whole file as one frame
+    when chunksize is None, otherwise frames of at most `chunksize` rows.
+    """
+    reader = pd.read_csv(file_path,
+                         header=0 if has_header else None,
+                         usecols=col_positions,
+                         chunksize=chunksize)
+    if chunksize is None:
+        reader = [reader]
+    for df in reader:
+        if has_header:
+            df_extracted = df[REQUIRED_COLS]
+        else:
+            df_extracted = df[col_positions]
+            df_extracted.columns = REQUIRED_COLS
+        yield df_extracted
+
+def build_hyperfacts_frame(df_extracted):
+    """
+    Builds hyperrelation facts column-wise from an extracted DataFrame.
+    Returns a DataFrame with columns drug1, relation, drug2, adverseEvent and PRR,
+    one row per fact, without creating any per-row Python objects. The source IDs
+    (drug1_rxnorm_id, drug2_rxnorm_id, condition_meddra_id) are carried along for
+    the vocabulary. PRR is converted to float here, once (non-numeric values become
+    0.0, as in safe_float).
+    """
+    return pd.DataFrame({
+        "drug1": df_extracted['drug_1_concept_name'].to_numpy(),
+        "relation": "interactWith",
+        "drug2": df_extracted['drug_2_concept_name'].to_numpy(),
+        "adverseEvent": df_extracted['condition_concept_name'].to_numpy(),
+        "PRR": prr_to_float(df_extracted['PRR']),
+        "drug1_rxnorm_id": df_extracted['drug_1_rxnorm_id'].to_numpy(),
+        "drug2_rxnorm_id": df_extracted['drug_2_rxnorm_id'].to_numpy(),
+        "condition_meddra_id": df_extracted['condition_meddra_id'].to_numpy(),
+    })
+
+def sort_hyperfacts_frame(hyperfacts):
+    """Stable sort of a hyperfacts frame by descending PRR (ties keep their input order)."""
+    order = np.argsort(-hyperfacts["PRR"].to_numpy(), kind="stable")
+    return hyperfacts.iloc[order].reset_index(drop=True)
+
+def _json_values(series):
+    """JSON-encodes a column, calling json.dumps once per distinct value rather than per row."""
+    if pd.api.types.is_float_dtype(series):
+        encoded = series.astype(str).to_numpy(dtype=object)
+        encoded[series.isna().to_numpy()] = "NaN"
+        encoded[(series == np.inf).to_numpy()] = "Infinity"
+        encoded[(series == -np.inf).to_numpy()] = "-Infinity"
+        return encoded
+    codes, uniques = pd.factorize(series)
+    dictionary = np.array([json.dumps(v) for v in uniques] + ["NaN"], dtype=object)
+    # factorize marks missing values with code -1, which picks the trailing "NaN"
+    return dictionary[codes]
+
+def format_hyperfacts_json(hyperfacts):
+    """
+    Renders every row of a hyperfacts frame as the text json.dump(..., indent=4)
+    writes for that fact inside the top-level array. Returns an object array of strings.
+    """
+    return ('    {\n        "drug1": ' + _json_values(hyperfacts["drug1"])
+            + ',\n        "relation": ' + _json_values(hyperfacts["relation"])
+            + ',\n        "drug2": ' + _json_values(hyperfacts["drug2"])
+            + ',\n        "attributes": {\n            "adverseEvent": ' + _json_values(hyperfacts["adverseEvent"])
+            + ',\n            "PRR": ' + _json_values(hyperfacts["PRR"])
+            + '\n        }\n    }')
+
+class HyperfactsJsonWriter:
+    """
+    Writes hyperfacts as a JSON array one frame at a time, so the facts never
+    have to be held in memory together. The output is laid out exactly like
+    json.dump(hyperfacts, f, indent=4).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "w")
+        self.count = 0
+
+    def write(self, hyperfacts):
+        """Appends the facts of a hyperfacts frame (see build_hyperfacts_frame)."""
+        if len(hyperfacts) == 0:
+            return
+        self.f.write("[\n" if self.count == 0 else ",\n")
+        self.f.write(",\n".join(format_hyperfacts_json(hyperfacts)))
+        self.count += len(hyperfacts)
+
+    def close(self):
+        self.f.write("[]" if self.count == 0 else "\n]")
+        self.f.close()
+
+
+def _fsync_dir(path):
+    """Flushes a directory entry (e.g. after a rename) to disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# On-disk layout of a sorted run (e.g. shards/split_000/run_00000.bin): one
+# fixed-size binary record (RUN_DTYPE) per hyperfact, in order, with names stored
+# as indices into the run's name list (-1 = missing) and source IDs as int64
+# (-1 = missing or malformed, as fact_store.source_ids). run_00000.json next to it
+# holds that name list and the number of records, and is written last: a run
+# without it is incomplete.
+RUN_DTYPE = np.dtype([
+    ("drug1", "<i4"),
+    ("drug2", "<i4"),
+    ("adverseEvent", "<i4"),
+    ("PRR", "<f8"),
+    ("drug1_rxnorm_id", "<i8"),
+    ("drug2_rxnorm_id", "<i8"),
+    ("condition_meddra_id", "<i8"),
+])
+RUN_NAME_COLUMNS = ("drug1", "drug2", "adverseEvent")
+RUN_ID_COLUMNS = ("drug1_rxnorm_id", "drug2_rxnorm_id", "condition_meddra_id")
+# Runs are read back this many rows at a time during the merge
+RUN_BLOCK_ROWS = 65536
+# Maximum number of runs merged at once; more runs are merged in several passes
+MERGE_FAN_IN = 64
+
+def run_meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+class RunWriter:
+    """Writes a sorted run (see RUN_DTYPE) one hyperfacts frame at a time."""
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "wb")
+        self.names = {}  # name -> index in the run's name list
+        self.count = 0
+
+    def write(self, hyperfacts):
+        records = np.empty(len(hyperfacts), dtype=RUN_DTYPE)
+        for column in RUN_NAME_COLUMNS:
+            codes, uniques = pd.factorize(hyperfacts[column])
+            lookup = np.array([self.names.setdefault(name, len(self.names)) for name in uniques.tolist()] + [-1],
+                              dtype=np.int32)
+            # factorize marks missing names with code -1, which picks the trailing -1
+            records[column] = lookup[codes]
+        records["PRR"] = hyperfacts["PRR"].to_numpy(dtype=np.float64)
+        for column in RUN_ID_COLUMNS:
+            records[column] = source_ids(hyperfacts[column].to_numpy())
+        self.f.write(records.tobytes())
+        self.count += len(hyperfacts)
+
+    def close(self):
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        with open(run_meta_path(self.path), "w") as f:
+            json.dump({"num_rows": self.count, "names": list(self.names)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+def write_run(path, frames):
+    """Writes a sorted run (an iterable of hyperfacts frames); returns its number of rows."""
+    writer = RunWriter(path)
+    for frame in frames:
+        writer.write(frame)
+    writer.close()
+    return writer.count
+
+def iter_run_blocks(path, block_rows=RUN_BLOCK_ROWS):
+    """Yields the facts of a run written by write_run() as hyperfacts frames of at most block_rows rows."""
+    with open(run_meta_path(path), "r") as f:
+        meta = json.load(f)
+    names = np.array(meta["names"] + [np.nan], dtype=object)  # index -1 -> NaN
+    with open(path, "rb") as f:
+        for start in range(0, meta["num_rows"], block_rows):
+            records = np.fromfile(f, dtype=RUN_DTYPE, count=min(block_rows, meta["num_rows"] - start))
+            yield pd.DataFrame({
+                "drug1": names[records["drug1"]],
+                "relation": "interactWith",
+                "drug2": names[records["drug2"]],
+                "adverseEvent": names[records["adverseEvent"]],
+                "PRR": records["PRR"],
+                **{column: records[column] for column in RUN_ID_COLUMNS},
+            })
+
+def remove_run(path):
+    os.remove(path)
+    os.remove(run_meta_path(path))
+
+def merge_sorted_runs(run_paths):
+    """
+    K-way merges runs that are each sorted by descending PRR, holding at most one
+    block per run in memory. Yields hyperfacts frames in descending PRR order; ties
+    keep run order and then row order, so the result equals a stable sort of the
+    runs concatenated in the given order.
+
+    Each round finds the run whose buffered block ends lowest in that order and
+    emits, from every buffer, the rows that sort no later than that block's last
+    row: nothing still unread can precede them.
+    """
+    readers = [iter_run_blocks(path) for path in run_paths]
+    buffers = [None] * len(readers)
+    while True:
+        for r, reader in enumerate(readers):
+            while reader is not None and (buffers[r] is None or len(buffers[r]) == 0):
+                buffers[r] = next(reader, None)
+                if buffers[r] is None:
+                    readers[r] = reader = None
+        active = [r for r in range(len(readers)) if readers[r] is not None]
+        if not active:
+            return
+
+        # Rows are ordered by (-PRR, run, row); the bound is the smallest "last key"
+        # among the buffered blocks
+        bound_run = min(active, key=lambda r: (-buffers[r]["PRR"].iat[-1], r))
+        bound = -buffers[bound_run]["PRR"].iat[-1]
+        emitted = []
+        for r in active:
+            neg_prr = -buffers[r]["PRR"].to_numpy()
+            if r == bound_run:
+                n = len(neg_prr)
+            else:
+                n = np.searchsorted(neg_prr, bound, side="right" if r < bound_run else "left")
+            if n:
+                emitted.append(buffers[r].iloc[:n])
+                buffers[r] = buffers[r].iloc[n:]
+        yield sort_hyperfacts_frame(pd.concat(emitted, ignore_index=True))
+
+def external_sort_runs(run_paths, tmp_dir, fan_in=MERGE_FAN_IN):
+    """
+    Merges any number of sorted runs into one descending-PRR stream of hyperfacts
+    frames. When there are more than `fan_in` runs, consecutive groups are first
+    merged into intermediate runs under tmp_dir, which keeps ties in input order.
+    """
+    level = 0
+    while len(run_paths) > fan_in:
+        os.makedirs(tmp_dir, exist_ok=True)
+        merged_paths = []
+        for i in range(0, len(run_paths), fan_in):
+            merged_path = os.path.join(tmp_dir, f"merge_{level}_{i // fan_in:05d}.bin")
+            write_run(merged_path, merge_sorted_runs(run_paths[i:i + fan_in]))
+            merged_paths.append(merged_path)
+        if level > 0:
+            for path in run_paths:
+                remove_run(path)
+        run_paths = merged_paths
+        level += 1
+    yield from merge_sorted_runs(run_paths)
+
+# Number of hash partitions the aggregation stage spreads facts over; each
+# partition is aggregated in memory on its own
+AGGREGATE_PARTITIONS = 64
+PRR_REDUCERS = ("max", "mean")
+
+def canonicalize_pairs(hyperfacts):
+    """Orders every drug pair by name (drug1 <= drug2), since TWOSIDES lists pairs in both orders."""
+    swap = (hyperfacts["drug1"] > hyperfacts["drug2"]).to_numpy()
+    swapped = {}
+    for first, second in [("drug1", "drug2"), ("drug1_rxnorm_id", "drug2_rxnorm_id")]:
+        a, b = hyperfacts[first].to_numpy(), hyperfacts[second].to_numpy()
+        swapped[first], swapped[second] = np.where(swap, b, a), np.where(swap, a, b)
+    return hyperfacts.assign(**swapped)
+
+def aggregate_runs(run_paths, tmp_dir, reducer="max", num_partitions=AGGREGATE_PARTITIONS):
+    """
+    Collapses the facts in `run_paths` to one fact per (canonical drug pair, condition),
+    reducing their PRRs with `reducer` ("max" or "mean").
+
+    Facts are hash-partitioned on their key into `num_partitions` spill files, and
+    each partition is then aggregated in memory and written as a sorted run. Returns
+    the paths of those runs, ready for external_sort_runs().
+    """
+    if reducer not in PRR_REDUCERS:
+        raise ValueError(f"Unknown PRR reducer: {reducer} (expected one of {PRR_REDUCERS})")
+    keys = ["drug1", "drug2", "adverseEvent"]
+    os.makedirs(tmp_dir, exist_ok=True)
+    partition_paths = [os.path.join(tmp_dir, f"partition_{p:05d}.bin") for p in range(num_partitions)]
+    partition_writers = [RunWriter(path) for path in partition_paths]
+    try:
+        for path in run_paths:
+            for block in iter_run_blocks(path):
+                block = canonicalize_pairs(block)
+                partition = pd.util.hash_pandas_object(block[keys], index=False).to_numpy() % num_partitions
+                for p, part in block.groupby(partition, sort=False):
+                    partition_writers[p].write(part)
+    finally:
+        for writer in partition_writers:
+            writer.close()
+
+    aggregated_paths = []
+    for p, path in enumerate(partition_paths):
+        blocks = list(iter_run_blocks(path))
+        remove_run(path)
+        if not blocks:
+            continue
+        facts = pd.concat(blocks, ignore_index=True)
+        # Missing source IDs (-1) become NaN, so "first" takes the first known one
+        facts = facts.assign(**{column: facts[column].where(facts[column] >= 0) for column in RUN_ID_COLUMNS})
+        aggregated = facts.groupby(keys, sort=True, dropna=False).agg(
+            PRR=("PRR", reducer),
+            drug1_rxnorm_id=("drug1_rxnorm_id", "first"),
+            drug2_rxnorm_id=("drug2_rxnorm_id", "first"),
+            condition_meddra_id=("condition_meddra_id", "first"),
+        ).reset_index()
+        aggregated = aggregated.assign(relation="interactWith")[facts.columns]
+        aggregated_path = os.path.join(tmp_dir, f"aggregated_{p:05d}.bin")
+        write_run(aggregated_path, [sort_hyperfacts_frame(aggregated)])
+        aggregated_paths.append(aggregated_path)
+    return aggregated_paths
+
+def extract_file_to_shard(file_path, shard_dir, col_positions, has_header, chunksize=None):
+    """
+    Extracts one split file into its own shard directory:
+      extracted.csv    - the required columns, without header
+      run_NNNNN.bin    - the hyperfacts of each chunk, sorted by descending PRR
+                         (with run_NNNNN.json, see RUN_DTYPE)
+      conditions.json  - the distinct conditions seen in the file
+    The shard is written under a temporary name, fsync'ed and then renamed into
+    place, so a shard directory that exists is always complete.
+    Runs in worker processes; returns the number of rows extracted.
+    """
+    tmp_dir = shard_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    num_rows = 0
+    conditions = set()
+    with open(os.path.join(tmp_dir, "extracted.csv"), "w") as csv_out:
+        chunks = read_required_columns(file_path, col_positions, has_header, chunksize)
+        for run_idx, df_extracted in enumerate(chunks):
+            df_extracted.to_csv(csv_out, index=False, header=False)
+            conditions.update(df_extracted['condition_concept_name'].dropna().unique())
+            # Spill this chunk's hyperfacts as a sorted run
+            hyperfacts = sort_hyperfacts_frame(build_hyperfacts_frame(df_extracted))
+            write_run(os.path.join(tmp_dir, f"run_{run_idx:05d}.bin"), [hyperfacts])
+            num_rows += len(df_extracted)
+        csv_out.flush()
+        os.fsync(csv_out.fileno())
+    with open(os.path.join(tmp_dir, "conditions.json"), "w") as f:
+        json.dump(list(conditions), f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.rename(tmp_dir, shard_dir)
+    _fsync_dir(os.path.dirname(shard_dir))
+    return num_rows
+
+def shard_run_paths(shard_dir):
+    """Paths of a shard's sorted runs, in input order."""
+    return [os.path.join(shard_dir, name) for name in sorted(os.listdir(shard_dir))
+            if name.startswith("run_") and name.endswith(".bin")]
+
+def load_merge_state(output_path):
+    """Returns the merge state recorded by merge_shards(), or None if there is none."""
+    state_path = os.path.join(output_path, "merge_state.json")
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+HYPERFACTS_FORMATS = ("json", "columnar", "both")
+
+def merge_shards(shard_names, shards_path, output_path, hyperfacts_format="json", incremental=False, aggregate=None):
+    """
+    Combines shards (in the given order) into extracted_data.csv, conditions.json
+    and the hyperfacts output. Hyperfacts are sorted by descending PRR with an
+    external merge of the shards' sorted runs, so memory stays bounded by the
+    number of runs times RUN_BLOCK_ROWS.
+
+    The merged shard names are recorded in merge_state.json. Every drug and
+    condition is also added to the persistent vocabulary vocab.json (see
+    fact_store.Vocabulary), whose IDs the columnar store uses.
+
+    incremental: `shard_names` are only new shards that come after every shard
+    already merged (per merge_state.json). The new rows are appended to
+    extracted_data.csv and the new conditions are added to conditions.json. The
+    columnar store gets the new facts as one more sorted segment (see
+    fact_store.ColumnarHyperfactsWriter), so updating it costs time proportional
+    to the new data only. hyperfacts.json is a single sorted array and cannot be
+    appended to: it is rewritten by merging the runs of all shards, which costs
+    time proportional to the whole dataset (though no CSV is re-read).
+
+    hyperfacts_format: "json" writes hyperfacts.json, "columnar" writes the
+    dictionary-encoded binary store hyperfacts/ (see fact_store.py), "both" writes both.
+
+    aggregate: if "max" or "mean", the hyperfacts are deduplicated by
+    (canonical drug pair, condition) with that PRR reducer (see aggregate_runs()).
+    Aggregated outputs cannot be merged incrementally.
+    """
+    if aggregate and incremental:
+        raise ValueError("Aggregated hyperfacts cannot be merged incrementally.")
+    if hyperfacts_format not in HYPERFACTS_FORMATS:
+        raise ValueError(f"Unknown hyperfacts format: {hyperfacts_format}")
+    state_path = os.path.join(output_path, "merge_state.json")
+    merged_shards = load_merge_state(output_path)["shards"] if incremental else []
+    # Until the merge completes, the outputs do not match any recorded state
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+    shard_dirs = [os.path.join(shards_path, name) for name in shard_names]
+    output_csv = os.path.join(output_path, "extracted_data.csv")
+    with open(output_csv, "a" if incremental else "w") as csv_out:
+        if not incremental:
+            csv_out.write(",".join(REQUIRED_COLS) + "\n")
+        for shard_dir in shard_dirs:
+            with open(os.path.join(shard_dir, "extracted.csv"), "r") as f:
+                shutil.copyfileobj(f, csv_out)
+    print(f"Extracted data from {len(merged_shards) + len(shard_dirs)} files saved to '{output_csv}'.")
+
+    # Save unique conditions to JSON
+    condition_set = set()
+    output_conditions = os.path.join(output_path, "conditions.json")
+    if incremental:
+        with open(output_conditions, "r") as f:
+            condition_set.update(json.load(f))
+    for shard_dir in shard_dirs:
+        with open(os.path.join(shard_dir, "conditions.json"), "r") as f:
+            condition_set.update(json.load(f))
+    conditions = list(condition_set)
+    with open(output_conditions, "w") as f:
+        json.dump(conditions, f, indent=4)
+    print(f"Unique conditions ({len(conditions)}) saved to '{output_conditions}'.")
+
+    vocab_path = os.path.join(output_path, "vocab.json")
+    vocab = Vocabulary.load_or_create(vocab_path)
+    json_path = os.path.join(output_path, "hyperfacts.json")
+    store_path = os.path.join(output_path, "hyperfacts")
+    write_json = hyperfacts_format in ("json", "both")
+    write_columnar = hyperfacts_format in ("columnar", "both")
+    new_runs = [path for shard_dir in shard_dirs for path in shard_run_paths(shard_dir)]
+    merge_tmp = os.path.join(output_path, "merge_tmp")
+
+    # Each pass merges sorted runs (in shard order, so ties keep filename order)
+    # into the PRR-descending output of its writers
+    if incremental:
+        passes = []
+        if write_columnar:
+            passes.append((new_runs, [ColumnarHyperfactsWriter(store_path, vocab, vocab_path, append=True)]))
+        if write_json:
+            all_runs = [path for name in merged_shards for path in shard_run_paths(os.path.join(shards_path, name))]
+            passes.append((all_runs + new_runs, [HyperfactsJsonWriter(json_path)]))
+    else:
+        run_paths = aggregate_runs(new_runs, merge_tmp, reducer=aggregate) if aggregate else new_runs
+        writers = []
+        if write_json:
+            writers.append(HyperfactsJsonWriter(json_path))
+        if write_columnar:
+            writers.append(ColumnarHyperfactsWriter(store_path, vocab, vocab_path))
+        passes = [(run_paths, writers)]
+
+    for run_paths, writers in passes:
+        for hyperfacts in external_sort_runs(run_paths, merge_tmp):
+            if not write_columnar:
+                # The columnar writer encodes the facts itself; otherwise just extend the vocabulary
+                encode_hyperfacts(vocab, hyperfacts)
+            for writer in writers:
+                writer.write(hyperfacts)
+        for writer in writers:
+            writer.close()
+        shutil.rmtree(merge_tmp, ignore_errors=True)
+    # Each writer's count covers all the facts in its output, appended or rewritten
+    writers = [writer for _, pass_writers in passes for writer in pass_writers]
+    output_hyperfacts = " and ".join(f"'{writer.path}' ({writer.count})" for writer in writers)
+    print(f"Hyperrelation facts saved to {output_hyperfacts}.")
+    vocab.save(vocab_path)
+    print(f"Vocabulary v{vocab.version} ({len(vocab)} entities) saved to '{vocab_path}'.")
+
+    state = {"shards": merged_shards + list(shard_names), "hyperfacts_format": hyperfacts_format,
+             "aggregate": aggregate}
+    with open(state_path + ".tmp", "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(state_path + ".tmp", state_path)
+
+def process_folder(folder_path, output_path, chunksize=None, workers=1, hyperfacts_format="json",
+                   aggregate=None):
+    """
+    Extracts the required columns and hyperrelation facts from every TWOSIDES
+    split CSV in `folder_path` and writes extracted_data.csv, conditions.json and
+    hyperfacts.json to `output_path`.
+
+    Each file is first extracted into its own shard under `output_path/shards/`,
+    and a file is recorded in processed_files.txt only once its shard is durably
+    on disk. Shards are kept between runs, and the outputs always cover every
+    processed file, merged in filename order. When the only new files sort after
+    those already merged (e.g. a new split was added), the outputs are updated
+    incrementally (see merge_shards()): extracted_data.csv and the columnar store
+    are extended with the new shards alone, while hyperfacts.json is rewritten.
+    Otherwise all outputs are rebuilt from all shards, still without re-reading
+    any processed CSV.
+
+    chunksize: if given, run in streaming mode. Each file is read `chunksize` rows
+    at a time and every chunk is spilled to disk (as a PRR-sorted run) before the
+    next one is read, so peak memory depends on the chunk size rather than on the
+    dataset size.
+
+    workers: number of processes extracting files in parallel. The merged output
+    is identical to a serial run (workers=1).
+
+    hyperfacts_format: "json" (hyperfacts.json), "columnar" (the compact binary
+    store hyperfacts/, see fact_store.py) or "both".
+
+    aggregate: None keeps every TWOSIDES row as a fact. "max" or "mean" puts each
+    drug pair in canonical (name) order and collapses duplicate (pair, condition)
+    facts into one, with that PRR reducer. Aggregated outputs are always rebuilt
+    from all shards.
+    """
     # Create the output directory if it does not exist
     os.makedirs(output_path, exist_ok=True)
     # Directory to store checkpoint file
     checkpoint_path = os.path.join(output_path, "processed_files.txt")
+    shards_path = os.path.join(output_path, "shards")
+    os.makedirs(shards_path, exist_ok=True)
     
     # Get list of CSV files in the folder and sort them by filename
     csv_files = sorted([f for f in os.listdir(folder_path) if f.lower().endswith(".csv")])
@@ -38,106 +571,79 @@ def process_folder(folder_path, output_path):
     processed_files = load_checkpoint(checkpoint_path)
     print(f"{len(processed_files)} files already processed; skipping them.")
     
-    # Initialize containers for accumulating results
-    extracted_data_frames = []
-    hyperfacts = []
-    condition_set = set()
-    
-    # Define the required columns to extract
-    required_cols = [
-        'drug_1_rxnorm_id', 
-        'drug_1_concept_name', 
-        'drug_2_rxnorm_id', 
-        'drug_2_concept_name', 
-        'condition_meddra_id', 
-        'condition_concept_name',
-        'PRR'  # Added PRR column
-    ]
-    
-    header_names = None
-    col_positions = None  # To record column indices from the first file
-    
+    if not csv_files:
+        print("No valid CSV files processed. Exiting.")
+        return
+
+    # Only the first file (by filename) carries a header; record column indices from it
+    col_positions = find_column_positions(os.path.join(folder_path, csv_files[0]))
+
+    # (filename, shard directory, extraction arguments) for every file still to process
+    jobs = []
     for idx, filename in enumerate(csv_files, start=1):
+        shard_dir = os.path.join(shards_path, os.path.splitext(filename)[0])
         if filename in processed_files:
-            print(f"Skipping already processed file: {filename}")
-            continue
+            if os.path.isdir(shard_dir):
+                print(f"Skipping already processed file: {filename}")
+                continue
+            # Processed before shards were kept: extract it again so it can be merged
+            print(f"No shard found for processed file {filename}; extracting it again.")
+        args = (os.path.join(folder_path, filename), shard_dir, col_positions, idx == 1, chunksize)
+        jobs.append((filename, shard_dir, args))
 
-        print(f"Processing file {idx}/{total_files}: {filename}")
-        file_path = os.path.join(folder_path, filename)
-        try:
-            if header_names is None:
-                # First file (or first unprocessed file that has header)
-                df = pd.read_csv(file_path)
-                header_names = df.columns.tolist()
+    extracted_shards = set()
+    def on_success(filename, num_rows):
+        # The shard is durably written; only now mark the file as processed
+        update_checkpoint(checkpoint_path, filename)
+        processed_files.add(filename)
+        extracted_shards.add(os.path.splitext(filename)[0])
+        print(f"Successfully processed file: {filename} ({num_rows} rows)")
+
+    if workers > 1:
+        print(f"Extracting {len(jobs)} files with {workers} worker processes.")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(extract_file_to_shard, *args): filename for filename, _, args in jobs}
+            for future in as_completed(futures):
+                filename = futures[future]
                 try:
-                    col_positions = [header_names.index(col) for col in required_cols]
-                except ValueError as ve:
-                    raise Exception(f"Required column missing in header of {filename}: {ve}")
-                df_extracted = df[required_cols].copy()
-            else:
-                # For files without header
-                df = pd.read_csv(file_path, header=None)
-                if col_positions is None:
-                    raise Exception("Column positions not recorded from the first file.")
-                df_extracted = df.iloc[:, col_positions].copy()
-                df_extracted.columns = required_cols
-
-            # Update condition set
-            condition_set.update(df_extracted['condition_concept_name'].dropna().unique())
-            # Append the extracted DataFrame to the list
-            extracted_data_frames.append(df_extracted)
-            
-            # Build hyperrelation facts for each row
-            for _, row in df_extracted.iterrows():
-                fact = (
-                    row['drug_1_concept_name'],
-                    "interactWith",
-                    row['drug_2_concept_name'],
-                    {"adverseEvent": row['condition_concept_name'], "PRR": row['PRR']}
-                )
-                hyperfacts.append(fact)
-                
-            # Update checkpoint for this file
-            update_checkpoint(checkpoint_path, filename)
-            print(f"Successfully processed file: {filename}")
-        except Exception as e:
-            print(f"Error processing '{filename}': {e}")
-    
+                    on_success(filename, future.result())
+                except Exception as e:
+                    print(f"Error processing '{filename}': {e}")
+    else:
+        for filename, _, args in jobs:
+            print(f"Processing file: {filename}")
+            try:
+                on_success(filename, extract_file_to_shard(*args))
+            except Exception as e:
+                print(f"Error processing '{filename}': {e}")
+
+    # Every processed file with a shard goes into the outputs, in filename order
+    shard_names = [os.path.splitext(filename)[0] for filename in csv_files
+                   if filename in processed_files
+                   and os.path.isdir(os.path.join(shards_path, os.path.splitext(filename)[0]))]
     # If no valid files processed, exit
-    if not extracted_data_frames:
+    if not shard_names:
         print("No valid CSV files processed. Exiting.")
         return
-    
-    # Combine all extracted dataframes and save to CSV
-    combined_df = pd.concat(extracted_data_frames, ignore_index=True)
-    output_csv = os.path.join(output_path, "extracted_data.csv")
-    combined_df.to_csv(output_csv, index=False)
-    print(f"Extracted data from {len(extracted_data_frames)} files saved to '{output_csv}'.")
-    
-    # Save unique conditions to JSON
-    conditions = list(condition_set)
-    output_conditions = os.path.join(output_path, "conditions.json")
-    with open(output_conditions, "w") as f:
-        json.dump(conditions, f, indent=4)
-    print(f"Unique conditions ({len(conditions)}) saved to '{output_conditions}'.")
-    
-    # Prepare hyperrelation facts as a list of dictionaries for clarity
-    hyperfacts_list = []
-    for drug1, relation, drug2, attributes in hyperfacts:
-        hyperfacts_list.append({
-            "drug1": drug1,
-            "relation": relation,
-            "drug2": drug2,
-            "attributes": attributes
-        })
-    
-    # Then update the sorting line:
-    hyperfacts_list.sort(key=lambda x: safe_float(x["attributes"]["PRR"]), reverse=True)
-    
-    output_hyperfacts = os.path.join(output_path, "hyperfacts.json")
-    with open(output_hyperfacts, "w") as f:
-        json.dump(hyperfacts_list, f, indent=4)
-    print(f"Hyperrelation facts ({len(hyperfacts_list)}) saved to '{output_hyperfacts}'.")
+
+    state = load_merge_state(output_path)
+    same_settings = state and state["hyperfacts_format"] == hyperfacts_format and state.get("aggregate") == aggregate
+    merged = state["shards"] if same_settings else None
+    # Incremental only if the merged shards are an unchanged prefix of the current ones
+    if merged is not None and shard_names[:len(merged)] == merged and not extracted_shards.intersection(merged):
+        new_shards = shard_names[len(merged):]
+        if not new_shards:
+            print("Outputs are already up to date.")
+            return
+        if aggregate:
+            print(f"Aggregating all {len(shard_names)} shards.")
+            merge_shards(shard_names, shards_path, output_path, hyperfacts_format, aggregate=aggregate)
+            return
+        print(f"Merging {len(new_shards)} new shards into the existing outputs.")
+        merge_shards(new_shards, shards_path, output_path, hyperfacts_format, incremental=True)
+    else:
+        print(f"Merging all {len(shard_names)} shards.")
+        merge_shards(shard_names, shards_path, output_path, hyperfacts_format, aggregate=aggregate)
 
 if __name__ == "__main__":
     # Example folder paths; adjust as needed.
@@ -147,3 +653,15 @@ if __name__ == "__main__":
     # folder_path = "./data/split_raw_twosides/"
     # output_path = "./output/split_raw_twosides/"
     process_folder(folder_path, output_path)
+
+    # Streaming mode for the full dataset: memory is bounded by the chunk size.
+    # process_folder(folder_path, output_path, chunksize=500_000)
+
+    # Spread the files over 8 worker processes; the output matches a serial run.
+    # process_folder(folder_path, output_path, workers=8)
+
+    # Write the compact columnar store (output/.../hyperfacts/) instead of hyperfacts.json.
+    # process_folder(folder_path, output_path, hyperfacts_format="columnar")
+
+    # One fact per (drug pair, condition), keeping the highest PRR.
+    # process_folder(folder_path, output_path, aggregate="max")
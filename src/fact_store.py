@@ -0,0 +1,248 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+import column_files
+
+# On-disk layout of a columnar hyperfacts store (a directory, e.g. output/test/hyperfacts/):
+#   meta.json        - format name/version, number of facts, relation, column dtypes
+#                      and the vocabulary (path and version) the codes refer to
+#   drug1.bin, drug2.bin, adverse_event.bin - int32 entity IDs from the vocabulary (-1 = missing)
+#   prr.bin          - float64 PRR values
+# The files follow column_files.py, and the column files are also appended to
+# while streaming. Each fact is thus an integer triple (drug1, drug2,
+# adverse_event) plus its PRR. The facts form one or more segments
+# (their sizes are listed in meta.json), each sorted by descending PRR: a full
+# merge writes one segment and every incremental merge appends another.
+STORE_FORMAT = "hyperfacts-columnar"
+STORE_VERSION = 3
+COLUMN_DTYPES = {"drug1": "<i4", "drug2": "<i4", "adverse_event": "<i4", "prr": "<f8"}
+
+# The vocabulary (vocab.json) maps entities and relations to integer IDs.
+# Drugs are keyed on their RxNorm ID and conditions on their MedDRA ID, and
+# entries are only ever appended, so an ID never changes once assigned. The
+# version is bumped whenever entries are added.
+VOCAB_FORMAT = "polypharmacy-vocab"
+RXNORM = "RxNorm"
+MEDDRA = "MedDRA"
+# interactWith is the fact relation; adverseEvent and PRR are the qualifier keys
+RELATIONS = ["interactWith", "adverseEvent", "PRR"]
+
+def is_columnar_store(path):
+    """True if `path` is a columnar hyperfacts store directory."""
+    return column_files.is_complete(path)
+
+def prr_to_float(prr):
+    """PRR values as float64, with non-numeric values mapped to 0.0 (as extract.safe_float)."""
+    return pd.to_numeric(pd.Series(prr), errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+
+def source_ids(ids):
+    """RxNorm/MedDRA IDs as int64, with missing or malformed IDs mapped to -1."""
+    return pd.to_numeric(pd.Series(ids), errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+
+class Vocabulary:
+    """
+    The shared entity/relation vocabulary written by the extractor (vocab.json).
+    Entity i is (sources[i], codes[i]) with display name names[i].
+    """
+    def __init__(self, sources=(), codes=(), names=(), relations=RELATIONS, version=0):
+        self.sources = list(sources)
+        self.codes = list(codes)
+        self.names = list(names)
+        self.relations = list(relations)
+        self.version = version
+        self.key2id = {(source, code): i for i, (source, code) in enumerate(zip(self.sources, self.codes))}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("format") != VOCAB_FORMAT:
+            raise ValueError(f"'{path}' is not a vocabulary file.")
+        entities = data["entities"]
+        return cls(entities["source"], entities["code"], entities["name"], data["relations"], data["version"])
+
+    @classmethod
+    def load_or_create(cls, path):
+        return cls.load(path) if os.path.exists(path) else cls()
+
+    def save(self, path):
+        """Writes vocab.json (atomically), bumping the version if entries were added."""
+        if self.dirty:
+            self.version += 1
+            self.dirty = False
+        data = {
+            "format": VOCAB_FORMAT,
+            "version": self.version,
+            "relations": self.relations,
+            "entities": {"source": self.sources, "code": self.codes, "name": self.names},
+        }
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def relation_id(self, relation):
+        return self.relations.index(relation)
+
+    def encode(self, source, codes, names):
+        """
+        Maps arrays of source IDs (with their names) to entity IDs, appending unseen
+        entities. Only distinct IDs are looked up, not every row. Missing or
+        malformed IDs map to -1 and are not added to the vocabulary.
+        """
+        codes = source_ids(codes)
+        names = np.asarray(names, dtype=object)
+        uniques, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, (code, name) in enumerate(zip(uniques.tolist(), names[first].tolist())):
+            if code < 0:
+                mapping[i] = -1
+                continue
+            entity_id = self.key2id.get((source, code))
+            if entity_id is None:
+                entity_id = self.key2id[(source, code)] = len(self.codes)
+                self.sources.append(source)
+                self.codes.append(code)
+                self.names.append(name)
+                self.dirty = True
+            mapping[i] = entity_id
+        return mapping[inverse.reshape(-1)]
+
+    def entity2id(self):
+        """Entity name -> ID, the mapping the HINGE code works with."""
+        return {name: i for i, name in enumerate(self.names)}
+
+    def relation2id(self):
+        return {relation: i for i, relation in enumerate(self.relations)}
+
+def encode_hyperfacts(vocab, hyperfacts):
+    """
+    Encodes a hyperfacts frame (as built by extract.build_hyperfacts_frame) as
+    vocabulary IDs: returns int32 arrays drug1, drug2 and adverse_event.
+    """
+    return {
+        "drug1": vocab.encode(RXNORM, hyperfacts["drug1_rxnorm_id"], hyperfacts["drug1"]),
+        "drug2": vocab.encode(RXNORM, hyperfacts["drug2_rxnorm_id"], hyperfacts["drug2"]),
+        "adverse_event": vocab.encode(MEDDRA, hyperfacts["condition_meddra_id"], hyperfacts["adverseEvent"]),
+    }
+
+class ColumnarHyperfactsWriter:
+    """
+    Writes hyperfacts frames (as built by extract.build_hyperfacts_frame) to a
+    columnar store, one frame at a time. Drugs and conditions are encoded as
+    vocabulary IDs as they arrive; the caller saves the vocabulary at `vocab_path`.
+
+    With append=True the frames become a new segment of the existing store at
+    `path`, and only they are written; otherwise the store is replaced.
+    """
+    def __init__(self, path, vocab, vocab_path, relation="interactWith", append=False):
+        self.path = path
+        self.vocab = vocab
+        self.vocab_path = vocab_path
+        self.relation = relation
+        self.segments = []
+        if append:
+            self.segments = column_files.read_meta(path, "hyperfacts store", STORE_FORMAT, STORE_VERSION)["segments"]
+        # Invalidate any previous store in this directory until close() completes
+        column_files.begin_write(path)
+        self.count = sum(self.segments)
+        self.files = {}
+        for name, dtype in COLUMN_DTYPES.items():
+            f = open(os.path.join(path, f"{name}.bin"), "r+b" if append else "wb")
+            # Drop anything past the recorded facts, e.g. from an interrupted append
+            f.truncate(self.count * np.dtype(dtype).itemsize)
+            f.seek(0, os.SEEK_END)
+            self.files[name] = f
+
+    def write(self, hyperfacts):
+        columns = encode_hyperfacts(self.vocab, hyperfacts)
+        columns["prr"] = prr_to_float(hyperfacts["PRR"].to_numpy())
+        for name, values in columns.items():
+            self.files[name].write(values.astype(COLUMN_DTYPES[name]).tobytes())
+        self.count += len(hyperfacts)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        new_facts = self.count - sum(self.segments)
+        meta = {
+            "format": STORE_FORMAT,
+            "version": STORE_VERSION,
+            "num_facts": self.count,
+            "segments": self.segments + ([new_facts] if new_facts or not self.segments else []),
+            "relation": self.relation,
+            "columns": COLUMN_DTYPES,
+            "vocab": os.path.relpath(self.vocab_path, self.path),
+            # The version the vocabulary will have once the caller saves it
+            "vocab_version": self.vocab.version + (1 if self.vocab.dirty else 0),
+        }
+        column_files.write_meta(self.path, meta)
+
+class HyperfactStore:
+    """
+    A loaded columnar hyperfacts store. The code and PRR columns are numpy arrays
+    (memory-mapped by default); names are only materialised on request, by
+    indexing the vocabulary's name array. The columns are always in descending
+    PRR order: a store of several segments is merged when loading, which reads
+    the columns into memory.
+    """
+    def __init__(self, path, mmap=True):
+        meta = column_files.read_meta(path, "hyperfacts store", STORE_FORMAT, STORE_VERSION)
+        self.path = path
+        self.relation = meta["relation"]
+        self.num_facts = meta["num_facts"]
+        self.vocab = Vocabulary.load(os.path.join(path, meta["vocab"]))
+        # The vocabulary is append-only, so any later version still decodes these IDs
+        if self.vocab.version < meta["vocab_version"]:
+            raise ValueError(f"Vocabulary for '{path}' is older than the store "
+                             f"(v{self.vocab.version} < v{meta['vocab_version']}).")
+        self.entities = np.array(self.vocab.names + [None], dtype=object)  # ID -1 -> None
+
+        sizes = {name: self.num_facts for name in meta["columns"]}
+        for name, values in column_files.map_columns(path, meta["columns"], sizes, mmap=mmap).items():
+            setattr(self, name, values)
+
+        self.segments = meta["segments"]
+        if len(self.segments) > 1:
+            # Each segment is sorted by descending PRR, so a stable sort of their
+            # concatenation merges them, with ties in segment order (as a full merge)
+            order = np.argsort(-np.asarray(self.prr), kind="stable")
+            for name in meta["columns"]:
+                setattr(self, name, np.asarray(getattr(self, name))[order])
+        # num_facts counts every stored fact; len() only those iter_rows yields
+        self.num_known = int(np.count_nonzero(self.known()))
+
+    def __len__(self):
+        """Number of facts without a missing drug or condition, as iter_rows yields them."""
+        return self.num_known
+
+    def names(self, column, start=0, stop=None):
+        """Decodes a slice of an ID column (drug1, drug2 or adverse_event) into names."""
+        return self.entities[np.asarray(getattr(self, column)[start:stop])]
+
+    def known(self, start=0, stop=None):
+        """Mask of the facts in a slice whose drugs and condition all have an ID (none is -1)."""
+        return ((np.asarray(self.drug1[start:stop]) >= 0) & (np.asarray(self.drug2[start:stop]) >= 0)
+                & (np.asarray(self.adverse_event[start:stop]) >= 0))
+
+    def iter_rows(self, batch_size=100_000):
+        """
+        Yields (drug1, drug2, adverse_event, PRR) tuples, decoding one batch at a time.
+        Facts with a missing drug or condition are skipped, as FactTable drops them.
+        """
+        for start in range(0, self.num_facts, batch_size):
+            stop = start + batch_size
+            keep = self.known(start, stop)
+            yield from zip(self.names("drug1", start, stop)[keep].tolist(),
+                           self.names("drug2", start, stop)[keep].tolist(),
+                           self.names("adverse_event", start, stop)[keep].tolist(),
+                           self.prr[start:stop][keep].tolist())
+
+def load_hyperfact_store(path, mmap=True):
+    """Opens a columnar hyperfacts store written by ColumnarHyperfactsWriter."""
+    return HyperfactStore(path, mmap=mmap)
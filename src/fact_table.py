@@ -0,0 +1,196 @@
+import json
+import heapq
+import numpy as np
+import pandas as pd
+
+from fact_store import RELATIONS, is_columnar_store, load_hyperfact_store, prr_to_float
+
+class FactTable:
+    """
+    Compact in-memory table of hyperfacts shared by the graph builder, the query
+    code and the HINGE data loader. Drugs and conditions are int32 entity codes
+    (vocabulary IDs when built from a columnar store), PRR is float32, and all
+    columns are contiguous numpy arrays in two sorted layouts:
+
+      by drug:      every fact appears under both of its drugs, sorted by
+                    (drug, partner, descending PRR). drug_offsets[d]:drug_offsets[d + 1]
+                    is drug d's block of partner/condition/prr.
+      by condition: every fact once, sorted by (condition, descending PRR).
+                    condition_offsets[c]:condition_offsets[c + 1] is condition c's
+                    block of cond_drug1/cond_drug2/cond_prr.
+
+    drug_slice(), pair_slice() and condition_slice() return views into these
+    arrays (no copying), and the whole table costs 36 bytes per fact.
+    """
+    def __init__(self, drug1, drug2, condition, prr, entity_names, relations=RELATIONS, relation="interactWith"):
+        """
+        drug1, drug2, condition: entity codes of each fact (indices into entity_names).
+        prr: PRR of each fact. Facts with a negative (missing) code are dropped.
+        """
+        drug1 = np.asarray(drug1, dtype=np.int32)
+        drug2 = np.asarray(drug2, dtype=np.int32)
+        condition = np.asarray(condition, dtype=np.int32)
+        prr = np.asarray(prr, dtype=np.float32)
+        valid = (drug1 >= 0) & (drug2 >= 0) & (condition >= 0)
+        if not valid.all():
+            drug1, drug2, condition, prr = drug1[valid], drug2[valid], condition[valid], prr[valid]
+
+        self.entity_names = np.asarray(entity_names, dtype=object)
+        self.relations = list(relations)
+        self.relation = relation
+        self._name2id = None
+        num_entities = len(self.entity_names)
+
+        # By drug: mirror each fact so it is listed under both drugs (self-pairs only once).
+        # Equal PRRs stay in fact order whichever way round a fact names its drugs,
+        # as in a MultiGraph built from the same facts.
+        mirror = drug1 != drug2
+        source = np.concatenate([drug1, drug2[mirror]])
+        partner = np.concatenate([drug2, drug1[mirror]])
+        directed_condition = np.concatenate([condition, condition[mirror]])
+        directed_prr = np.concatenate([prr, prr[mirror]])
+        fact_order = np.concatenate([np.arange(len(prr)), np.flatnonzero(mirror)])
+        order = np.lexsort((fact_order, -directed_prr, partner, source))
+        self.partner = partner[order]
+        self.condition = directed_condition[order]
+        self.prr = directed_prr[order]
+        self.drug_offsets = _offsets(source, num_entities)
+
+        # By condition: each fact once
+        order = np.lexsort((-prr, condition))
+        self.cond_drug1 = drug1[order]
+        self.cond_drug2 = drug2[order]
+        self.cond_prr = prr[order]
+        self.condition_offsets = _offsets(condition, num_entities)
+
+    @classmethod
+    def from_store(cls, store):
+        """Builds a table from a columnar HyperfactStore, keeping its vocabulary IDs."""
+        return cls(store.drug1, store.drug2, store.adverse_event, store.prr,
+                   store.vocab.names, store.vocab.relations, store.relation)
+
+    @classmethod
+    def from_hyperfacts(cls, hyperfacts):
+        """Builds a table from a list of hyperfact dictionaries (hyperfacts.json)."""
+        frame = pd.DataFrame({
+            "drug1": [fact["drug1"] for fact in hyperfacts],
+            "drug2": [fact["drug2"] for fact in hyperfacts],
+            "condition": [fact["attributes"]["adverseEvent"] for fact in hyperfacts],
+            "prr": [fact["attributes"]["PRR"] for fact in hyperfacts],
+        })
+        # One code space for drug and condition names, as in the vocabulary
+        names = pd.concat([frame["drug1"], frame["drug2"], frame["condition"]], ignore_index=True)
+        codes, entity_names = pd.factorize(names)
+        n = len(frame)
+        return cls(codes[:n], codes[n:2 * n], codes[2 * n:], prr_to_float(frame["prr"]), entity_names)
+
+    def __len__(self):
+        return len(self.cond_prr)
+
+    @property
+    def nbytes(self):
+        """Memory held by the fact arrays (excluding the entity names)."""
+        arrays = [self.partner, self.condition, self.prr, self.drug_offsets,
+                  self.cond_drug1, self.cond_drug2, self.cond_prr, self.condition_offsets]
+        return sum(array.nbytes for array in arrays)
+
+    def entity_id(self, entity):
+        """Entity code for a name (or a code, passed through); -1 if unknown."""
+        if isinstance(entity, (int, np.integer)):
+            return int(entity)
+        if self._name2id is None:
+            self._name2id = {name: i for i, name in enumerate(self.entity_names.tolist())}
+        return self._name2id.get(entity, -1)
+
+    def drug_slice(self, drug):
+        """(partner, condition, prr) views of every fact involving `drug`."""
+        d = self.entity_id(drug)
+        if d < 0:
+            return self.partner[:0], self.condition[:0], self.prr[:0]
+        start, stop = self.drug_offsets[d], self.drug_offsets[d + 1]
+        return self.partner[start:stop], self.condition[start:stop], self.prr[start:stop]
+
+    def pair_slice(self, drug_a, drug_b):
+        """(condition, prr) views of the facts between two drugs, in descending PRR order."""
+        a, b = self.entity_id(drug_a), self.entity_id(drug_b)
+        if a < 0 or b < 0:
+            return self.condition[:0], self.prr[:0]
+        start, stop = self.drug_offsets[a], self.drug_offsets[a + 1]
+        block = self.partner[start:stop]
+        lo = start + np.searchsorted(block, b, side="left")
+        hi = start + np.searchsorted(block, b, side="right")
+        return self.condition[lo:hi], self.prr[lo:hi]
+
+    def condition_slice(self, condition):
+        """(drug1, drug2, prr) views of the facts for `condition`, in descending PRR order."""
+        c = self.entity_id(condition)
+        if c < 0:
+            return self.cond_drug1[:0], self.cond_drug2[:0], self.cond_prr[:0]
+        start, stop = self.condition_offsets[c], self.condition_offsets[c + 1]
+        return self.cond_drug1[start:stop], self.cond_drug2[start:stop], self.cond_prr[start:stop]
+
+    def fact_columns(self):
+        """(drug1, drug2, condition, prr) with every fact once, in condition order."""
+        counts = np.diff(self.condition_offsets)
+        condition = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        return self.cond_drug1, self.cond_drug2, condition, self.cond_prr
+
+    def names(self, codes):
+        """Decodes an array of entity codes into names."""
+        return self.entity_names[np.asarray(codes)]
+
+    @staticmethod
+    def prr_list(prr):
+        """
+        float32 PRR values as Python floats, using the shortest decimal that
+        round-trips in float32 (22.922, not 22.922000885009766).
+        """
+        return np.asarray(prr).astype(str).astype(np.float64).tolist()
+
+    def regimen_top_k(self, drug_list, k):
+        """The k riskiest (d1, d2, condition, PRR) facts across all pairs of drug_list."""
+        pairs = regimen_pairs(drug_list)
+        slices = [self.pair_slice(d1, d2) for d1, d2 in pairs]
+        picks = merge_top_k([prr for _, prr in slices], k)
+        conditions = self.names(np.array([slices[i][0][pos] for i, pos in picks], dtype=np.int64)).tolist()
+        prrs = self.prr_list(np.array([slices[i][1][pos] for i, pos in picks], dtype=np.float32))
+        return [(*pairs[i], condition, prr) for (i, _), condition, prr in zip(picks, conditions, prrs)]
+
+def regimen_pairs(drug_list):
+    """
+    Unordered pairs of the distinct drugs in drug_list, each once, as (d1, d2)
+    with d1 < d2 (the order the query results use), in drug_list order.
+    """
+    drugs = list(dict.fromkeys(drug_list))
+    return [(d1, d2) if d1 < d2 else (d2, d1)
+            for i, d1 in enumerate(drugs) for d2 in drugs[i + 1:]]
+
+def merge_top_k(sorted_runs, k):
+    """
+    Positions of the k largest values across several arrays that are each sorted
+    in descending order, as (run, position) in descending value order. Only the
+    head of each run is on the heap at a time, so this touches at most
+    k + len(sorted_runs) values and stops as soon as k have been taken.
+    """
+    heap = [(-float(run[0]), i, 0) for i, run in enumerate(sorted_runs) if len(run)]
+    heapq.heapify(heap)
+    picks = []
+    while heap and len(picks) < k:
+        _, i, pos = heapq.heappop(heap)
+        picks.append((i, pos))
+        if pos + 1 < len(sorted_runs[i]):
+            heapq.heappush(heap, (-float(sorted_runs[i][pos + 1]), i, pos + 1))
+    return picks
+
+def _offsets(codes, num_entities):
+    """CSR offsets: the rows of entity i are offsets[i]:offsets[i + 1] once sorted by code."""
+    offsets = np.zeros(num_entities + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=num_entities), out=offsets[1:])
+    return offsets
+
+def load_fact_table(path):
+    """Loads a FactTable from a columnar hyperfacts store directory or hyperfacts.json."""
+    if is_columnar_store(path):
+        return FactTable.from_store(load_hyperfact_store(path))
+    with open(path, "r") as f:
+        return FactTable.from_hyperfacts(json.load(f))
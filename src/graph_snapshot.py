@@ -0,0 +1,110 @@
+import gc
+import os
+import json
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+# Binary snapshot of a polypharmacy MultiGraph (polypharmacy_multigraph.npz), a
+# compact alternative to the node-link JSON. It is an uncompressed .npz archive of:
+#   meta           - JSON string with the format name/version and counts
+#   nodes          - node names, in graph order
+#   conditions     - distinct adverseEvent names
+#   edge_u, edge_v - int32 node indices of each edge, in G.edges() order
+#   edge_condition - int32 index into conditions (-1 = missing adverseEvent)
+#   edge_prr       - float64 PRR
+# Loading reads a handful of arrays instead of parsing one JSON object per edge,
+# and rebuilds the graph in one pass (build_multigraph).
+SNAPSHOT_FORMAT = "polypharmacy-graph-snapshot"
+SNAPSHOT_VERSION = 1
+
+@contextmanager
+def paused_gc():
+    """
+    Pauses the cyclic garbage collector while millions of small dicts are created:
+    they contain no cycles, and collections triggered by their allocation would
+    otherwise rescan the whole growing graph over and over.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def build_multigraph(drug1, drug2, adverse_event, prr, nodes=None):
+    """
+    Builds a MultiGraph in one pass from columnar arrays: one edge per
+    (drug1[i], drug2[i]) with attributes adverseEvent=adverse_event[i], PRR=prr[i].
+    `nodes` optionally fixes the node order (and adds isolated nodes).
+
+    The graph is built through the public networkx API only (add_nodes_from,
+    add_edge), so nodes, edge keys and iteration order are exactly those of
+    adding the facts one by one, on any networkx version. The columns are
+    converted to Python scalars in bulk and the garbage collector is paused
+    while the edges go in. (add_edges_from with precomputed keys was measured
+    slower than add_edge on networkx 3.x.)
+    """
+    G = nx.MultiGraph()
+    add_edge = G.add_edge
+    with paused_gc():
+        if nodes is not None:
+            G.add_nodes_from(nodes)
+        for d1, d2, event, prr_value in zip(_as_list(drug1), _as_list(drug2), _as_list(adverse_event), _as_list(prr)):
+            add_edge(d1, d2, adverseEvent=event, PRR=prr_value)
+    return G
+
+def _as_list(values):
+    """numpy arrays as lists of Python scalars; lists are passed through unchanged."""
+    return values.tolist() if isinstance(values, np.ndarray) else values
+
+def save_graph_snapshot(G, path):
+    """Writes G (edges with adverseEvent/PRR attributes) as a binary snapshot at `path`."""
+    nodes = list(G.nodes)
+    node_index = {node: i for i, node in enumerate(nodes)}
+    edge_u, edge_v, events, prrs = [], [], [], []
+    with paused_gc():
+        # Same order as G.edges(): each undirected edge once, from the first node reached
+        seen = set()
+        for u, nbrs in G.adj.items():
+            for v, keydict in nbrs.items():
+                if v in seen:
+                    continue
+                for data in keydict.values():
+                    edge_u.append(node_index[u])
+                    edge_v.append(node_index[v])
+                    events.append(data["adverseEvent"])
+                    prrs.append(data["PRR"])
+            seen.add(u)
+    # factorize codes missing (None/NaN) conditions as -1, which is stored as such
+    edge_condition, conditions = pd.factorize(pd.Series(events, dtype=object))
+    edge_u = np.array(edge_u, dtype=np.int32)
+    edge_v = np.array(edge_v, dtype=np.int32)
+    edge_prr = np.array(prrs, dtype=np.float64)
+    num_edges = len(edge_u)
+    meta = {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION,
+            "num_nodes": len(nodes), "num_edges": num_edges}
+
+    # Write to a temporary file first: a running query engine may reload `path`
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), nodes=np.array(nodes, dtype=str),
+                 conditions=np.array(list(conditions), dtype=str), edge_u=edge_u, edge_v=edge_v,
+                 edge_condition=edge_condition.astype(np.int32), edge_prr=edge_prr)
+    os.replace(path + ".tmp", path)
+
+def load_graph_snapshot(path):
+    """Loads a MultiGraph saved by save_graph_snapshot."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported graph snapshot '{path}': {meta.get('format')} v{meta.get('version')}")
+        nodes = data["nodes"].astype(object)
+        # Index -1 (a missing condition) picks the trailing NaN, as hyperfacts.json has it
+        conditions = np.array(data["conditions"].tolist() + [np.nan], dtype=object)
+        return build_multigraph(nodes[data["edge_u"]], nodes[data["edge_v"]],
+                                conditions[data["edge_condition"]], data["edge_prr"], nodes=nodes.tolist())
+
+def is_graph_snapshot(path):
+    return path.endswith(".npz")
@@ -0,0 +1,132 @@
+import time
+import torch
+import torch.nn.functional as F
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, SequentialSampler
+
+from negative_sampler import NegativeSampler
+
+# Facts per training step
+TRAIN_BATCH_SIZE = 256
+
+def pad_kv_pairs(kv_lists, max_pairs=None):
+    """
+    Pads a batch of facts' key-value pair lists [[(k_id, v_id), ...], ...]
+    (each of any length) into the padded form HINGEModel's forward takes.
+    Returns kv_pairs => LongTensor [B, N, 2] (zeros at the padding) and
+    kv_mask => BoolTensor [B, N], with N the longest list (or max_pairs).
+    Lists longer than max_pairs are silently truncated to their first
+    max_pairs pairs, so those facts lose their remaining attributes.
+    """
+    lengths = torch.tensor([len(kv) for kv in kv_lists], dtype=torch.long)
+    num_pairs = max_pairs if max_pairs is not None else int(lengths.max()) if len(kv_lists) else 0
+    kv_mask = torch.arange(num_pairs).unsqueeze(0) < lengths.unsqueeze(1)
+    kv_pairs = torch.zeros((len(kv_lists), num_pairs, 2), dtype=torch.long)
+    flat = [pair for kv in kv_lists for pair in kv[:num_pairs]]
+    if flat:
+        kv_pairs[kv_mask] = torch.tensor(flat, dtype=torch.long)
+    return kv_pairs, kv_mask
+
+def encode_fact_tensors(encoded_facts, max_pairs=None):
+    """
+    Packs ID facts [(h_id, r_id, t_id, [(k_id, v_id), ...]), ...] (as produced by
+    encode_facts / encode_fact_table in HINGE/hinge.ipynb) into int64 tensors,
+    once, so training never touches Python tuples again:
+      h, r, t  => [num_facts]
+      kv_pairs => [num_facts, N, 2], zero-padded to the longest fact (or max_pairs,
+                  truncating longer facts, see pad_kv_pairs)
+      kv_mask  => [num_facts, N] bool, True for the real pairs
+    """
+    num_facts = len(encoded_facts)
+    hrt = torch.tensor([(h, r, t) for (h, r, t, _) in encoded_facts], dtype=torch.long).view(num_facts, 3)
+    kv_pairs, kv_mask = pad_kv_pairs([kv for (_, _, _, kv) in encoded_facts], max_pairs)
+    return FactTensors(hrt[:, 0].contiguous(), hrt[:, 1].contiguous(), hrt[:, 2].contiguous(), kv_pairs, kv_mask)
+
+class FactTensors(Dataset):
+    """
+    Pre-encoded facts as tensors (see encode_fact_tensors). Indexed with a list
+    of fact indices it returns the whole mini-batch (h, r, t, kv_pairs, kv_mask)
+    with one gather per tensor, so a DataLoader over it never collates per fact.
+    """
+    def __init__(self, h, r, t, kv_pairs, kv_mask):
+        self.h, self.r, self.t = h, r, t
+        self.kv_pairs, self.kv_mask = kv_pairs, kv_mask
+
+    def __len__(self):
+        return len(self.h)
+
+    def __getitem__(self, indices):
+        indices = torch.as_tensor(indices, dtype=torch.long)
+        return (self.h[indices], self.r[indices], self.t[indices],
+                self.kv_pairs[indices], self.kv_mask[indices])
+
+def fact_loader(facts, batch_size=TRAIN_BATCH_SIZE, shuffle=True, num_workers=0):
+    """
+    Mini-batch DataLoader over FactTensors. Batches of indices are drawn by a
+    (shuffled) BatchSampler and gathered in one step each; with num_workers > 0
+    the gathering runs in background worker processes.
+    """
+    sampler = RandomSampler(facts) if shuffle else SequentialSampler(facts)
+    return DataLoader(facts, sampler=BatchSampler(sampler, batch_size, drop_last=False), batch_size=None,
+                      num_workers=num_workers, persistent_workers=num_workers > 0)
+
+class HingeTrainer:
+    """
+    Mini-batch trainer for HINGE models whose forward takes a padded batch,
+    model(h, r, t, kv_pairs, kv_mask) => [B, 1] scores (HINGEModel in
+    HINGE/hinge.ipynb). Each step scores a batch of positives and their
+    negatives (num_negatives per positive, from a NegativeSampler, see
+    negative_sampler.py) in one forward each, with the softplus loss of the
+    original loop averaged over the batch, and every epoch logs its throughput
+    in facts/sec.
+    """
+    def __init__(self, model, optimizer, num_negatives=1, sampler=None, device="cpu"):
+        """
+        :param num_negatives: Negatives drawn per positive fact.
+        :param sampler: NegativeSampler to draw them with (by default one is
+                        built over the facts passed to fit); it is moved to device.
+        """
+        self.device = torch.device(device)
+        self.model = model.to(self.device)
+        self.optimizer = optimizer
+        self.num_negatives = num_negatives
+        self.sampler = sampler.to(self.device) if sampler is not None else None
+
+    def train_step(self, h, r, t, kv_pairs, kv_mask):
+        """One optimizer step on a mini-batch; returns the summed loss."""
+        h, r, t = h.to(self.device), r.to(self.device), t.to(self.device)
+        kv_pairs, kv_mask = kv_pairs.to(self.device), kv_mask.to(self.device)
+        *negatives, valid = self.sampler.sample(h, r, t, kv_pairs, kv_mask, self.num_negatives)
+
+        pos_score = self.model(h, r, t, kv_pairs, kv_mask).view(-1)
+        neg_score = self.model(*negatives).view(-1, self.num_negatives)
+        # Each positive against the mean of its valid negatives
+        valid = valid.view(-1, self.num_negatives).float()
+        neg_loss = (F.softplus(neg_score) * valid).sum(dim=1) / valid.sum(dim=1).clamp(min=1)
+        loss = F.softplus(-pos_score) + neg_loss
+
+        self.optimizer.zero_grad()
+        loss.mean().backward()
+        self.optimizer.step()
+        return loss.sum().item()
+
+    def fit(self, facts, epochs=1, batch_size=TRAIN_BATCH_SIZE, num_workers=0):
+        """
+        Trains on FactTensors for `epochs` shuffled passes.
+        Returns per-epoch {"epoch", "loss", "seconds", "facts_per_sec"}.
+        """
+        if self.sampler is None:
+            self.sampler = NegativeSampler(facts).to(self.device)
+        loader = fact_loader(facts, batch_size, shuffle=True, num_workers=num_workers)
+        history = []
+        self.model.train()
+        for epoch in range(epochs):
+            start = time.perf_counter()
+            total_loss = 0.0
+            for batch in loader:
+                total_loss += self.train_step(*batch)
+            elapsed = time.perf_counter() - start
+            history.append({"epoch": epoch, "loss": total_loss, "seconds": elapsed,
+                            "facts_per_sec": len(facts) / elapsed if elapsed > 0 else 0.0})
+            print(f"Epoch {epoch}, total_loss = {total_loss:.4f} "
+                  f"({elapsed:.1f}s, {history[-1]['facts_per_sec']:,.0f} facts/sec)")
+        return history
@@ -0,0 +1,147 @@
+import torch
+
+# Ways a positive fact can be corrupted
+CORRUPTION_MODES = ("head", "tail", "relation", "value")
+# 64-bit FNV-1a style mixing of IDs into a fact hash (int64 arithmetic wraps around)
+HASH_PRIME = 0x100000001B3
+HASH_SEED = -0x340D631B7BDDDCDB  # the FNV offset basis as a signed int64
+# Rounds of redrawing for negatives that turn out to be known facts
+MAX_RESAMPLE_ROUNDS = 10
+
+def hash_facts(h, r, t, kv_pairs, kv_mask):
+    """
+    int64 hash of each fact (h, r, t, its real (k, v) pairs in order), computed
+    column-wise over a whole batch. Padding pairs do not change the hash.
+    """
+    acc = torch.full(h.shape, HASH_SEED, dtype=torch.long, device=h.device)
+    for column in (h, r, t):
+        acc = (acc ^ (column + 1)) * HASH_PRIME
+    for i in range(kv_pairs.size(1)):
+        mixed = (acc ^ (kv_pairs[:, i, 0] + 1)) * HASH_PRIME
+        mixed = (mixed ^ (kv_pairs[:, i, 1] + 1)) * HASH_PRIME
+        acc = torch.where(kv_mask[:, i], mixed, acc)
+    return acc
+
+class NegativeSampler:
+    """
+    Vectorized, filtered, type-aware negative sampler for HINGE training.
+
+    For a batch of positive facts (h, r, t, kv_pairs, kv_mask, as FactTensors
+    in hinge_trainer.py yields them) sample() draws num_negatives corruptions
+    of each, all in one call. Each negative replaces one part of its fact:
+      head / tail - with another drug (an entity seen as a head or tail)
+      relation    - with another base relation
+      value       - one of the fact's attribute values, with another value seen
+                    under the same key (conditions for adverseEvent, PRRs for PRR)
+    Negatives that are known facts are found in a sorted tensor of all fact
+    hashes (hash_facts) and redrawn; the few still known after
+    MAX_RESAMPLE_ROUNDS are reported as invalid.
+    """
+    def __init__(self, facts, modes=CORRUPTION_MODES):
+        """
+        :param facts: FactTensors of the known (positive) facts.
+        :param modes: Corruption modes to use; modes with fewer than two
+                      candidates (e.g. a single base relation) are skipped.
+        """
+        self.fact_hashes = torch.unique(hash_facts(facts.h, facts.r, facts.t, facts.kv_pairs, facts.kv_mask))
+
+        # Candidate pools, by role
+        self.drugs = torch.unique(torch.cat([facts.h, facts.t]))
+        self.relations = torch.unique(facts.r)
+        # Values per key as one sorted tensor: key k's values are
+        # key_values[key_offsets[k]:key_offsets[k + 1]]
+        pairs = torch.unique(facts.kv_pairs[facts.kv_mask], dim=0)  # distinct (k, v), sorted by k
+        num_keys = int(pairs[:, 0].max()) + 1 if len(pairs) else 0
+        self.key_values = pairs[:, 1].contiguous()
+        self.key_offsets = torch.zeros(num_keys + 1, dtype=torch.long)
+        self.key_offsets[1:] = torch.cumsum(torch.bincount(pairs[:, 0], minlength=num_keys), 0)
+
+        pool_sizes = {"head": len(self.drugs), "tail": len(self.drugs), "relation": len(self.relations),
+                      "value": int((self.key_offsets[1:] - self.key_offsets[:-1]).max()) if num_keys else 0}
+        self.modes = [mode for mode in modes if pool_sizes[mode] > 1]
+        if not self.modes:
+            raise ValueError(f"None of the corruption modes {list(modes)} has more than one candidate.")
+
+    def to(self, device):
+        """Moves the fact hashes and candidate pools to `device` (once, not per batch); returns self."""
+        for name in ("fact_hashes", "drugs", "relations", "key_values", "key_offsets"):
+            setattr(self, name, getattr(self, name).to(device))
+        return self
+
+    def is_known(self, h, r, t, kv_pairs, kv_mask):
+        """
+        True for the facts (batch of tensors) that are among the known facts.
+        The batch must be on the sampler's device (see to).
+        """
+        query = hash_facts(h, r, t, kv_pairs, kv_mask)
+        pos = torch.searchsorted(self.fact_hashes, query).clamp(max=len(self.fact_hashes) - 1)
+        return self.fact_hashes[pos] == query
+
+    def _draw(self, pool, n):
+        return pool[torch.randint(0, len(pool), (n,), device=pool.device)]
+
+    def _corrupt(self, h, r, t, kv_pairs, kv_mask, mode):
+        """
+        One corruption of every fact, each with its mode (index into self.modes).
+        Returns the corrupted (h, r, t, kv_pairs) and a mask of the facts that
+        could not be corrupted and were left unchanged.
+        """
+        device = h.device
+        h, r, t, kv_pairs = h.clone(), r.clone(), t.clone(), kv_pairs.clone()
+        unchanged = torch.zeros(h.shape, dtype=torch.bool, device=device)
+        names = self.modes
+        if "head" in names:
+            sel = mode == names.index("head")
+            h[sel] = self._draw(self.drugs, int(sel.sum()))
+        if "tail" in names:
+            sel = mode == names.index("tail")
+            t[sel] = self._draw(self.drugs, int(sel.sum()))
+        if "relation" in names:
+            sel = mode == names.index("relation")
+            r[sel] = self._draw(self.relations, int(sel.sum()))
+        if "value" in names:
+            sel = mode == names.index("value")
+            has_kv = kv_mask.any(dim=1)
+            # Facts without attributes get a tail corruption instead
+            no_kv = sel & ~has_kv
+            t[no_kv] = self._draw(self.drugs, int(no_kv.sum()))
+            rows = (sel & has_kv).nonzero(as_tuple=True)[0]
+            if len(rows):
+                # A random real pair of each selected fact, given another value of its key.
+                # Keys the sampler never saw have no values to draw from, so their
+                # facts are left unchanged (and redrawn by sample()).
+                slot = torch.multinomial(kv_mask[rows].float(), 1).squeeze(1)
+                keys = kv_pairs[rows, slot, 0]
+                seen_key = keys < len(self.key_offsets) - 1
+                keys = torch.where(seen_key, keys, torch.zeros_like(keys))
+                start, count = self.key_offsets[keys], self.key_offsets[keys + 1] - self.key_offsets[keys]
+                pick = start + (torch.rand(len(rows), device=device) * count).long()
+                known_key = seen_key & (count > 0)
+                kv_pairs[rows[known_key], slot[known_key], 1] = self.key_values[pick[known_key]]
+                unchanged[rows[~known_key]] = True
+        return h, r, t, kv_pairs, unchanged
+
+    def sample(self, h, r, t, kv_pairs, kv_mask, num_negatives=1):
+        """
+        num_negatives corrupted facts per positive. Returns (h, r, t, kv_pairs,
+        kv_mask, valid) for B * num_negatives negatives, the negatives of fact i at
+        rows i * num_negatives ... (i + 1) * num_negatives - 1; valid is False for
+        the rare negatives that could not be moved off a known fact, or not
+        corrupted at all (e.g. a value under a key the sampler never saw).
+        """
+        h, r, t = (x.repeat_interleave(num_negatives) for x in (h, r, t))
+        kv_pairs = kv_pairs.repeat_interleave(num_negatives, dim=0)
+        kv_mask = kv_mask.repeat_interleave(num_negatives, dim=0)
+        mode = torch.randint(0, len(self.modes), h.shape, device=h.device)
+
+        neg_h, neg_r, neg_t, neg_kv, unchanged = self._corrupt(h, r, t, kv_pairs, kv_mask, mode)
+        known = self.is_known(neg_h, neg_r, neg_t, neg_kv, kv_mask) | unchanged
+        for _ in range(MAX_RESAMPLE_ROUNDS):
+            rows = known.nonzero(as_tuple=True)[0]
+            if not len(rows):
+                break
+            *redrawn, unchanged = self._corrupt(h[rows], r[rows], t[rows], kv_pairs[rows], kv_mask[rows], mode[rows])
+            for neg, new in zip((neg_h, neg_r, neg_t, neg_kv), redrawn):
+                neg[rows] = new
+            known[rows] = self.is_known(*redrawn, kv_mask[rows]) | unchanged
+        return neg_h, neg_r, neg_t, neg_kv, kv_mask, ~known
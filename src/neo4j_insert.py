@@ -1,6 +1,15 @@
 import os
+import csv
 import json
+import time
+import zlib
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from neo4j import GraphDatabase
+from neo4j.exceptions import ServiceUnavailable, SessionExpired, TransientError
+
+from fact_store import HyperfactStore, is_columnar_store, load_hyperfact_store
 
 # Connection parameters – update these as needed
 NEO4J_URI = "bolt://localhost:7687"
@@ -19,10 +28,177 @@ def create_database_if_not_exists(driver, db_name):
         except Exception as e:
             print(f"Database '{db_name}' might already exist or cannot be created. Error: {e}")
 
-def insert_hyperfacts(driver, db_name, hyperfacts):
+# Graph models the loader can write:
+#   bidirectional - every fact becomes two INTERACT_WITH relationships (d1->d2 and
+#                   d2->d1), MERGEd on their full property map.
+#   single        - one INTERACT_WITH relationship per (drug pair, condition), stored
+#                   from the lower to the higher drug name and queried undirected.
+#                   MERGE matches on adverseEvent only; a repeated fact keeps the
+#                   highest PRR.
+#   reified       - one (:Interaction {drug1, drug2}) node per drug pair, linked from
+#                   both drugs by PARTICIPATES_IN, with one
+#                   (:Interaction)-[:CAUSES {PRR}]->(:Condition) relationship per condition.
+GRAPH_MODELS = ["bidirectional", "single", "reified"]
+
+# Created before loading: the uniqueness constraints also give every MERGE on
+# these nodes an index lookup instead of a label scan per fact.
+SCHEMA_QUERIES = {
+    "bidirectional": [
+        "CREATE CONSTRAINT drug_name IF NOT EXISTS FOR (d:Drug) REQUIRE d.name IS UNIQUE",
+    ],
+    "single": [
+        "CREATE CONSTRAINT drug_name IF NOT EXISTS FOR (d:Drug) REQUIRE d.name IS UNIQUE",
+    ],
+    "reified": [
+        "CREATE CONSTRAINT drug_name IF NOT EXISTS FOR (d:Drug) REQUIRE d.name IS UNIQUE",
+        "CREATE CONSTRAINT condition_name IF NOT EXISTS FOR (c:Condition) REQUIRE c.name IS UNIQUE",
+        "CREATE CONSTRAINT interaction_pair IF NOT EXISTS FOR (i:Interaction) REQUIRE (i.drug1, i.drug2) IS UNIQUE",
+    ],
+}
+
+def check_graph_model(model):
+    if model not in GRAPH_MODELS:
+        raise ValueError(f"Unknown graph model '{model}', expected one of {GRAPH_MODELS}.")
+
+def create_schema(driver, db_name, model="bidirectional"):
+    """Creates the constraints/indexes the loader relies on, and waits for them to come online."""
+    check_graph_model(model)
+    with driver.session(database=db_name) as session:
+        for query in SCHEMA_QUERIES[model]:
+            session.run(query)
+        session.run("CALL db.awaitIndexes()")
+    print(f"Schema ready in database '{db_name}'.")
+
+def iter_fact_rows(hyperfacts):
+    """
+    Yields (drug1, drug2, adverse_event, PRR) for each fact, from either a list of
+    fact dictionaries (hyperfacts.json) or a columnar HyperfactStore.
+    """
+    if isinstance(hyperfacts, HyperfactStore):
+        yield from hyperfacts.iter_rows()
+        return
+    yield from map(fact_row, hyperfacts)
+
+def fact_row(fact):
+    """(drug1, drug2, adverse_event, PRR) of one fact dictionary."""
+    attributes = fact.get("attributes", {})
+    return fact.get("drug1"), fact.get("drug2"), attributes.get("adverseEvent"), attributes.get("PRR", 0)  # Default to 0 if missing
+
+def iter_fact_rows_at(hyperfacts, indices):
+    """Yields the rows of iter_fact_rows for the facts at the given positions only."""
+    if isinstance(hyperfacts, HyperfactStore):
+        yield from zip(hyperfacts.entities[hyperfacts.drug1[indices]].tolist(),
+                       hyperfacts.entities[hyperfacts.drug2[indices]].tolist(),
+                       hyperfacts.entities[hyperfacts.adverse_event[indices]].tolist(),
+                       hyperfacts.prr[indices].tolist())
+        return
+    for i in indices.tolist():
+        yield fact_row(hyperfacts[i])
+
+# Facts sent per UNWIND query, each in its own explicit transaction
+INSERT_BATCH_SIZE = 10_000
+
+# One UNWIND query per graph model; each takes $facts as built by iter_fact_batches
+INSERT_QUERIES = {
+    "bidirectional": """
+UNWIND $facts AS fact
+MERGE (d1:Drug {name: fact.drug1})
+MERGE (d2:Drug {name: fact.drug2})
+MERGE (d1)-[:INTERACT_WITH {adverseEvent: fact.adverse_event, PRR: fact.prr_value}]->(d2)
+MERGE (d2)-[:INTERACT_WITH {adverseEvent: fact.adverse_event, PRR: fact.prr_value}]->(d1)
+""",
+    "single": """
+UNWIND $facts AS fact
+WITH fact, fact.drug1 <= fact.drug2 AS ordered
+MERGE (d1:Drug {name: CASE WHEN ordered THEN fact.drug1 ELSE fact.drug2 END})
+MERGE (d2:Drug {name: CASE WHEN ordered THEN fact.drug2 ELSE fact.drug1 END})
+MERGE (d1)-[r:INTERACT_WITH {adverseEvent: fact.adverse_event}]->(d2)
+ON CREATE SET r.PRR = fact.prr_value
+ON MATCH SET r.PRR = CASE WHEN fact.prr_value > r.PRR THEN fact.prr_value ELSE r.PRR END
+""",
+    "reified": """
+UNWIND $facts AS fact
+WITH fact, fact.drug1 <= fact.drug2 AS ordered
+WITH fact, CASE WHEN ordered THEN fact.drug1 ELSE fact.drug2 END AS name1,
+           CASE WHEN ordered THEN fact.drug2 ELSE fact.drug1 END AS name2
+MERGE (d1:Drug {name: name1})
+MERGE (d2:Drug {name: name2})
+MERGE (i:Interaction {drug1: name1, drug2: name2})
+MERGE (d1)-[:PARTICIPATES_IN]->(i)
+MERGE (d2)-[:PARTICIPATES_IN]->(i)
+MERGE (c:Condition {name: fact.adverse_event})
+MERGE (i)-[r:CAUSES]->(c)
+ON CREATE SET r.PRR = fact.prr_value
+ON MATCH SET r.PRR = CASE WHEN fact.prr_value > r.PRR THEN fact.prr_value ELSE r.PRR END
+""",
+}
+
+# Top-k riskiest interactions among a list of drugs, per graph model. Each fact is
+# matched exactly once (d1.name < d2.name), with the same columns for every model.
+RISK_QUERIES = {
+    "bidirectional": """
+MATCH (d1:Drug)-[r:INTERACT_WITH]->(d2:Drug)
+WHERE d1.name IN $drug_list AND d2.name IN $drug_list AND d1.name < d2.name
+RETURN d1.name AS Drug1, d2.name AS Drug2, r.adverseEvent AS Condition, r.PRR AS Risk
+ORDER BY Risk DESC
+LIMIT $k
+""",
+    "single": """
+MATCH (d1:Drug)-[r:INTERACT_WITH]-(d2:Drug)
+WHERE d1.name IN $drug_list AND d2.name IN $drug_list AND d1.name < d2.name
+RETURN d1.name AS Drug1, d2.name AS Drug2, r.adverseEvent AS Condition, r.PRR AS Risk
+ORDER BY Risk DESC
+LIMIT $k
+""",
+    "reified": """
+MATCH (d1:Drug)-[:PARTICIPATES_IN]->(i:Interaction)<-[:PARTICIPATES_IN]-(d2:Drug)
+WHERE d1.name IN $drug_list AND d2.name IN $drug_list AND d1.name < d2.name
+MATCH (i)-[r:CAUSES]->(c:Condition)
+RETURN d1.name AS Drug1, d2.name AS Drug2, c.name AS Condition, r.PRR AS Risk
+ORDER BY Risk DESC
+LIMIT $k
+""",
+}
+
+# Top-k per drug pair for a whole list of pairs in one query, per graph model.
+# $pairs holds [name1, name2] lists with name1 < name2; pairs without facts return no row.
+PAIR_RISK_QUERIES = {
+    "bidirectional": """
+UNWIND $pairs AS pair
+MATCH (:Drug {name: pair[0]})-[r:INTERACT_WITH]->(:Drug {name: pair[1]})
+WITH pair, r ORDER BY r.PRR DESC
+RETURN pair[0] AS Drug1, pair[1] AS Drug2, collect([r.adverseEvent, r.PRR])[..$k] AS Risks
+""",
+    "single": """
+UNWIND $pairs AS pair
+MATCH (:Drug {name: pair[0]})-[r:INTERACT_WITH]-(:Drug {name: pair[1]})
+WITH pair, r ORDER BY r.PRR DESC
+RETURN pair[0] AS Drug1, pair[1] AS Drug2, collect([r.adverseEvent, r.PRR])[..$k] AS Risks
+""",
+    "reified": """
+UNWIND $pairs AS pair
+MATCH (:Interaction {drug1: pair[0], drug2: pair[1]})-[r:CAUSES]->(c:Condition)
+WITH pair, r, c ORDER BY r.PRR DESC
+RETURN pair[0] AS Drug1, pair[1] AS Drug2, collect([c.name, r.PRR])[..$k] AS Risks
+""",
+}
+
+def iter_fact_batches(hyperfacts, batch_size=INSERT_BATCH_SIZE):
+    """Yields lists of up to batch_size fact parameter maps, as expected by INSERT_QUERIES."""
+    batch = []
+    for drug1, drug2, adverse_event, prr_value in iter_fact_rows(hyperfacts):
+        batch.append({"drug1": drug1, "drug2": drug2, "adverse_event": adverse_event, "prr_value": prr_value})
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_hyperfacts(driver, db_name, hyperfacts, batch_size=INSERT_BATCH_SIZE, max_retries=5,
+                      model="bidirectional"):
     """
     Inserts hyperrelation facts into the Neo4j database.
-    Each fact has the format:
+    `hyperfacts` is a columnar HyperfactStore or a list of facts in the format:
       {
           "drug1": <drug_name_1>,
           "relation": "interactWith",
@@ -32,69 +208,292 @@ def insert_hyperfacts(driver, db_name, hyperfacts):
               "PRR": <PRR_value>
           }
       }
+    Facts are sent batch_size at a time as one UNWIND query per explicit
+    transaction, so loading takes one round trip per batch rather than per fact.
+    Batches failing with a transient error are retried up to max_retries times.
+    `model` selects the graph model written (see GRAPH_MODELS).
+    `driver` only needs session(database=...) -> begin_transaction() -> run()/commit(),
+    so a stand-in driver can be passed to count round trips (see bench_neo4j.py).
     """
+    check_graph_model(model)
     total_facts = len(hyperfacts)
+    inserted = 0
+    start = time.perf_counter()
     with driver.session(database=db_name) as session:
-        for idx, fact in enumerate(hyperfacts, start=1):
-            drug1 = fact.get("drug1")
-            drug2 = fact.get("drug2")
-            attributes = fact.get("attributes", {})
-            adverse_event = attributes.get("adverseEvent")
-            prr_value = attributes.get("PRR", 0)  # Default to 0 if missing
-            
-            # Escape apostrophes in the condition name
-            safe_adverse_event = adverse_event.replace("'", "\\'")  # Proper escaping for Neo4j
-            
-            query = """
-            MERGE (d1:Drug {name: $drug1})
-            MERGE (d2:Drug {name: $drug2})
-            MERGE (d1)-[r:INTERACT_WITH {adverseEvent: $adverse_event, PRR: $prr_value}]->(d2)
-            MERGE (d2)-[r2:INTERACT_WITH {adverseEvent: $adverse_event, PRR: $prr_value}]->(d1)
-            RETURN d1, d2, r, r2
-            """
-            
-            session.run(query, 
-                        drug1=drug1, 
-                        drug2=drug2, 
-                        adverse_event=adverse_event, 
-                        prr_value=prr_value)
-            
-            print(f"[{idx}/{total_facts}] Inserted: {drug1} ↔ {drug2} → {adverse_event} (PRR: {prr_value})")
-
-def insert_hyperfacts_from_json(json_path):
-    """
-    Given a JSON file containing hyperrelation facts, this function:
+        for batch in iter_fact_batches(hyperfacts, batch_size):
+            write_batch_with_retry(session, batch, max_retries, INSERT_QUERIES[model])
+            inserted += len(batch)
+            elapsed = time.perf_counter() - start
+            print(f"[{inserted}/{total_facts}] facts inserted ({inserted / max(elapsed, 1e-9):,.0f} facts/sec)")
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {inserted} facts in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):,.0f} facts/sec).")
+
+# Errors worth retrying a batch for: lock timeouts/deadlocks and dropped connections
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+def drug_bucket(drug, num_buckets):
+    """Stable bucket of a drug name (the same in every run and process)."""
+    return zlib.crc32(str(drug).encode("utf-8")) % num_buckets
+
+def bucket_rounds(num_buckets):
+    """
+    Schedules the cells (i, j), i <= j, of a num_buckets x num_buckets grid into
+    rounds in which no two cells share a bucket: first all (i, i) cells, then
+    a round-robin tournament over the buckets. Every cell appears exactly once.
+    """
+    rounds = [[(i, i) for i in range(num_buckets)]]
+    buckets = list(range(num_buckets)) + ([None] if num_buckets % 2 else [])
+    n = len(buckets)
+    for _ in range(n - 1):
+        matches = [(buckets[i], buckets[n - 1 - i]) for i in range(n // 2)]
+        rounds.append([tuple(sorted(match)) for match in matches if None not in match])
+        buckets = [buckets[0], buckets[-1]] + buckets[1:-1]
+    return rounds
+
+def partition_facts(hyperfacts, num_buckets):
+    """
+    Groups the facts into grid cells by the buckets of their two drugs: a fact on
+    (d1, d2) goes to cell (min, max) of their buckets. Returns {cell: positions
+    of its facts}, in fact order; the parameter maps are only built batch by
+    batch while writing (see iter_fact_rows_at), so the partition holds a few
+    bytes per fact rather than a dictionary.
+    For a HyperfactStore, each vocabulary entity is hashed once and the drug ID
+    columns are mapped to buckets in one vectorised lookup; facts with a missing
+    drug or condition are left out, as iter_rows skips them.
+    """
+    if isinstance(hyperfacts, HyperfactStore):
+        entity_buckets = np.array([drug_bucket(name, num_buckets) for name in hyperfacts.vocab.names],
+                                  dtype=np.int64)
+        positions = np.flatnonzero(hyperfacts.known())
+        bucket1 = entity_buckets[hyperfacts.drug1[positions]]
+        bucket2 = entity_buckets[hyperfacts.drug2[positions]]
+    else:
+        buckets = {}
+        bucket_pairs = []
+        for drug1, drug2, _, _ in iter_fact_rows(hyperfacts):
+            for drug in (drug1, drug2):
+                if drug not in buckets:
+                    buckets[drug] = drug_bucket(drug, num_buckets)
+            bucket_pairs.append((buckets[drug1], buckets[drug2]))
+        positions = np.arange(len(bucket_pairs))
+        bucket1, bucket2 = np.array(bucket_pairs, dtype=np.int64).reshape(-1, 2).T
+    cell_ids = np.minimum(bucket1, bucket2) * num_buckets + np.maximum(bucket1, bucket2)
+    order = np.argsort(cell_ids, kind="stable")
+    cell_ids, positions = cell_ids[order], positions[order]
+    cell_starts = np.flatnonzero(np.r_[True, cell_ids[1:] != cell_ids[:-1]]) if len(cell_ids) else []
+    return {divmod(int(cell_ids[start]), num_buckets): cell_positions
+            for start, cell_positions in zip(cell_starts, np.split(positions, cell_starts[1:]))}
+
+def write_batch_with_retry(session, batch, max_retries, query=INSERT_QUERIES["bidirectional"]):
+    """Writes one batch in an explicit transaction, retrying transient failures with backoff."""
+    for attempt in range(max_retries + 1):
+        try:
+            with session.begin_transaction() as tx:
+                tx.run(query, facts=batch)
+                tx.commit()
+            return
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = min(0.1 * 2 ** attempt, 5.0)
+            print(f"Transient error ({type(e).__name__}), retrying batch in {delay:.1f}s: {e}")
+            time.sleep(delay)
+
+def insert_hyperfacts_concurrent(driver, db_name, hyperfacts, workers=4, batch_size=INSERT_BATCH_SIZE,
+                                 num_buckets=None, max_retries=5, model="bidirectional"):
+    """
+    Inserts hyperrelation facts from `workers` threads, each with its own session
+    from the driver's connection pool.
+
+    Drugs are hashed into num_buckets buckets (default 2 * workers) and facts are
+    partitioned into cells by the buckets of their drug pair. Cells run in rounds
+    (see bucket_rounds) in which no two cells share a bucket, so transactions that
+    run at the same time never touch the same :Drug nodes and cannot deadlock on
+    them. Batches are still retried on transient errors, up to max_retries times.
+    With the reified model, cells do share :Condition nodes, so expect some retries.
+    """
+    check_graph_model(model)
+    num_buckets = num_buckets or 2 * workers
+    total_facts = len(hyperfacts)
+    cells = partition_facts(hyperfacts, num_buckets)
+    inserted = 0
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def write_cell(cell):
+        nonlocal inserted
+        positions = cells[cell]
+        with driver.session(database=db_name) as session:
+            for i in range(0, len(positions), batch_size):
+                batch = [{"drug1": drug1, "drug2": drug2, "adverse_event": adverse_event, "prr_value": prr_value}
+                         for drug1, drug2, adverse_event, prr_value
+                         in iter_fact_rows_at(hyperfacts, positions[i:i + batch_size])]
+                write_batch_with_retry(session, batch, max_retries, INSERT_QUERIES[model])
+                with lock:
+                    inserted += len(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for round_cells in bucket_rounds(num_buckets):
+            # list() waits for the whole round and re-raises any worker error
+            list(executor.map(write_cell, [cell for cell in round_cells if cell in cells]))
+            elapsed = time.perf_counter() - start
+            print(f"[{inserted}/{total_facts}] facts inserted ({inserted / max(elapsed, 1e-9):,.0f} facts/sec)")
+    elapsed = time.perf_counter() - start
+    print(f"Inserted {inserted} facts with {workers} workers in {elapsed:.1f}s "
+          f"({inserted / max(elapsed, 1e-9):,.0f} facts/sec).")
+
+def load_hyperfacts(path):
+    """
+    Loads hyperrelation facts from hyperfacts.json or from a columnar store
+    directory (hyperfacts/). The columnar store is memory-mapped and decoded
+    batch by batch during insertion instead of being parsed up front.
+    """
+    if is_columnar_store(path):
+        return load_hyperfact_store(path)
+    with open(path, "r") as f:
+        return json.load(f)
+
+def insert_hyperfacts_from_json(json_path, batch_size=INSERT_BATCH_SIZE, driver=None, workers=1,
+                                model="bidirectional"):
+    """
+    Given a JSON file (or columnar store directory) containing hyperrelation facts, this function:
       1. Derives the target database name from the JSON file's folder.
-      2. Connects to a local Neo4j instance.
-      3. Creates the database if it doesn't exist.
-      4. Inserts hyperrelation facts into the database with progress messages.
+      2. Connects to a local Neo4j instance (unless a driver is passed in).
+      3. Creates the database if it doesn't exist, and its constraints/indexes.
+      4. Inserts hyperrelation facts into the database in batches of batch_size,
+         from `workers` concurrent sessions if workers > 1, as the given graph model.
     """
     # Derive the database name from the JSON file path.
-    output_path = os.path.dirname(json_path)
+    output_path = os.path.dirname(os.path.normpath(json_path))
     db_name = os.path.basename(os.path.normpath(output_path))
     print(f"Derived database name from JSON path: '{db_name}'")
 
-    # Load hyperrelation facts from the JSON file.
-    with open(json_path, "r") as f:
-        hyperfacts = json.load(f)
+    # Load hyperrelation facts from the JSON file (or columnar store).
+    hyperfacts = load_hyperfacts(json_path)
     print(f"Loaded {len(hyperfacts)} hyperrelation facts from '{json_path}'.")
 
     # Create a Neo4j driver instance.
-    driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    print(f"Connected to Neo4j at {NEO4J_URI}")
+    if driver is None:
+        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD),
+                                      max_connection_pool_size=max(100, workers + 1))
+        print(f"Connected to Neo4j at {NEO4J_URI}")
 
     # Create the target database if it does not already exist.
     create_database_if_not_exists(driver, db_name)
 
+    # Constraints/indexes first, so every MERGE is an index lookup.
+    create_schema(driver, db_name, model)
+
     # Insert hyperrelation facts with progress output.
-    insert_hyperfacts(driver, db_name, hyperfacts)
+    if workers > 1:
+        insert_hyperfacts_concurrent(driver, db_name, hyperfacts, workers, batch_size, model=model)
+    else:
+        insert_hyperfacts(driver, db_name, hyperfacts, batch_size, model=model)
 
     driver.close()
     print("Neo4j connection closed.")
 
+def admin_import_double(value):
+    """Formats a PRR for a :double column; the importer spells inf/nan as Infinity/NaN."""
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return repr(value)
+
+def export_admin_import_csv(json_path, output_dir, model="bidirectional"):
+    """
+    Writes node and relationship CSVs for `neo4j-admin database import full`,
+    the fastest way to load a fresh database, instead of inserting through Cypher.
+    For the bidirectional and single models:
+      drugs.csv         - name:ID(Drug),:LABEL
+      interactions.csv  - :START_ID(Drug),:END_ID(Drug),:TYPE,adverseEvent,PRR:double
+    with INTERACT_WITH relationships in both directions (bidirectional) or from the
+    lower to the higher drug name (single). For the reified model:
+      drugs.csv, conditions.csv, interactions.csv (the :Interaction nodes),
+      participates.csv (PARTICIPATES_IN) and causes.csv (CAUSES, with PRR:double).
+    Unlike MERGE, the import does not collapse repeated facts, so extract with
+    aggregate="max" or "mean" if the input may contain them.
+
+    :param json_path: Path to hyperfacts.json or a columnar store directory.
+    :param output_dir: Directory to write the CSVs to.
+    :param model: Graph model to export (see GRAPH_MODELS).
+    :return: The neo4j-admin command that imports them.
+    """
+    check_graph_model(model)
+    os.makedirs(output_dir, exist_ok=True)
+    hyperfacts = load_hyperfacts(json_path)
+    paths = {}
+
+    def open_csv(name, header):
+        paths[name] = os.path.join(output_dir, f"{name}.csv")
+        f = open(paths[name], "w", newline="")
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return f, writer
+
+    drugs = {}  # insertion-ordered sets of names
+    conditions = {}
+    pairs = {}  # (name1, name2) -> :Interaction ID
+    if model == "reified":
+        interaction_file, interaction_writer = open_csv("interactions", [":ID(Interaction)", "drug1", "drug2", ":LABEL"])
+        participates_file, participates_writer = open_csv("participates", [":START_ID(Drug)", ":END_ID(Interaction)", ":TYPE"])
+        causes_file, causes_writer = open_csv("causes", [":START_ID(Interaction)", ":END_ID(Condition)", ":TYPE", "PRR:double"])
+        for drug1, drug2, adverse_event, prr_value in iter_fact_rows(hyperfacts):
+            name1, name2 = (drug1, drug2) if drug1 <= drug2 else (drug2, drug1)
+            drugs[name1] = drugs[name2] = None
+            conditions[adverse_event] = None
+            pair_id = pairs.get((name1, name2))
+            if pair_id is None:
+                pair_id = pairs[(name1, name2)] = len(pairs)
+                interaction_writer.writerow([pair_id, name1, name2, "Interaction"])
+                participates_writer.writerows((name, pair_id, "PARTICIPATES_IN") for name in dict.fromkeys((name1, name2)))
+            causes_writer.writerow([pair_id, adverse_event, "CAUSES", admin_import_double(prr_value)])
+        for f in (interaction_file, participates_file, causes_file):
+            f.close()
+        f, writer = open_csv("conditions", ["name:ID(Condition)", ":LABEL"])
+        with f:
+            writer.writerows((name, "Condition") for name in conditions)
+    else:
+        f, writer = open_csv("interactions", [":START_ID(Drug)", ":END_ID(Drug)", ":TYPE", "adverseEvent", "PRR:double"])
+        with f:
+            for drug1, drug2, adverse_event, prr_value in iter_fact_rows(hyperfacts):
+                drugs[drug1] = drugs[drug2] = None
+                prr_value = admin_import_double(prr_value)
+                if model == "single" and drug2 < drug1:
+                    drug1, drug2 = drug2, drug1
+                writer.writerow([drug1, drug2, "INTERACT_WITH", adverse_event, prr_value])
+                if model == "bidirectional":
+                    writer.writerow([drug2, drug1, "INTERACT_WITH", adverse_event, prr_value])
+
+    f, writer = open_csv("drugs", ["name:ID(Drug)", ":LABEL"])
+    with f:
+        writer.writerows((name, "Drug") for name in drugs)
+
+    print(f"Exported {len(drugs)} drugs and {len(hyperfacts)} facts ({model} model) to '{output_dir}'.")
+    db_name = os.path.basename(os.path.dirname(os.path.normpath(json_path)))
+    if model == "reified":
+        node_files = ["drugs", "conditions", "interactions"]
+        relationship_files = ["participates", "causes"]
+    else:
+        node_files, relationship_files = ["drugs"], ["interactions"]
+    command = " ".join([f"neo4j-admin database import full {db_name}"] +
+                       [f"--nodes={os.path.abspath(paths[name])}" for name in node_files] +
+                       [f"--relationships={os.path.abspath(paths[name])}" for name in relationship_files])
+    print(f"Import with (database stopped): {command}")
+    print("Then create the schema with create_schema() before any further MERGE-based loads.")
+    return command
+
 if __name__ == "__main__":
     # Specify the path to your hyperfacts JSON file.
     json_file_path = "./output/test/hyperfacts.json"
 
     # json_file_path = "./output/split_raw_twosides/hyperfacts.json"
+    # json_file_path = "./output/split_raw_twosides/hyperfacts"  # columnar store
     insert_hyperfacts_from_json(json_file_path)
+    # insert_hyperfacts_from_json(json_file_path, batch_size=5_000, workers=8)  # concurrent writers
+    # insert_hyperfacts_from_json(json_file_path, model="single")  # one relationship per fact
+
+    # Or, for a fresh database, export CSVs for neo4j-admin's offline bulk import:
+    # export_admin_import_csv(json_file_path, "./output/test/neo4j_import/")
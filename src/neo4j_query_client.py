@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from neo4j import GraphDatabase
+
+from fact_table import regimen_pairs
+from neo4j_insert import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, PAIR_RISK_QUERIES, check_graph_model
+
+# Pair results kept in the client's LRU cache
+PAIR_CACHE_SIZE = 100_000
+
+class RiskQueryClient:
+    """
+    Reusable Neo4j risk-query client. It holds one long-lived driver (and so one
+    connection pool) for its whole life, answers every pair of a regimen, or of
+    many regimens, with a single UNWIND query returning the top k per pair, and
+    keeps the most recent pair results in a bounded LRU cache.
+    Safe to share between threads.
+    """
+    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD, database=None,
+                 model="bidirectional", cache_size=PAIR_CACHE_SIZE, driver=None):
+        """
+        :param database: Database to query (None for the server's default).
+        :param model: Graph model the database was loaded with (see neo4j_insert.GRAPH_MODELS).
+        :param cache_size: Maximum number of pair results kept in the cache.
+        :param driver: An existing driver to use instead of connecting to `uri`.
+        """
+        check_graph_model(model)
+        self.driver = driver if driver is not None else GraphDatabase.driver(uri, auth=(user, password))
+        self.database = database
+        self.query = PAIR_RISK_QUERIES[model]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (name1, name2) -> (k fetched, [(condition, PRR), ...])
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.round_trips = 0
+
+    def close(self):
+        self.driver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _cached(self, pair, k):
+        """Cached top-k for a pair, or None. A result fetched with a larger k, or
+        holding every fact of the pair, also answers a smaller/larger k."""
+        entry = self.cache.get(pair)
+        if entry is None:
+            return None
+        fetched_k, risks = entry
+        if fetched_k < k and len(risks) == fetched_k:
+            return None  # there may be more than we fetched
+        self.cache.move_to_end(pair)
+        return risks[:k]
+
+    def _store(self, pair, k, risks):
+        self.cache[pair] = (k, risks)
+        self.cache.move_to_end(pair)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def query_pairs(self, pairs, k):
+        """
+        Top-k (condition, PRR) for each (name1, name2) pair, name1 < name2, as
+        {pair: [(condition, PRR), ...]}. Pairs not in the cache are fetched
+        together in one query; pairs without facts map to [].
+        """
+        k = int(k)
+        results = {}
+        missing = []
+        with self.lock:
+            for pair in dict.fromkeys(pairs):
+                risks = self._cached(pair, k)
+                if risks is None:
+                    missing.append(pair)
+                else:
+                    results[pair] = risks
+            self.hits += len(results)
+            self.misses += len(missing)
+        if not missing:
+            return results
+
+        fetched = {pair: [] for pair in missing}
+        with self.driver.session(database=self.database) as session:
+            records = session.run(self.query, pairs=[list(pair) for pair in missing], k=k)
+            for record in records:
+                fetched[(record["Drug1"], record["Drug2"])] = [tuple(risk) for risk in record["Risks"]]
+        with self.lock:
+            self.round_trips += 1
+            for pair, risks in fetched.items():
+                self._store(pair, k, risks)
+        results.update(fetched)
+        return results
+
+    def query_regimen(self, drug_list, k):
+        """
+        Top-k highest-PRR interactions for each pair of drugs in drug_list, in the
+        same form as networkx_query's query_polypharmacy_risk:
+        {(d1, d2): [(d1, d2, condition, PRR), ...]} with d1 < d2.
+        """
+        return self.query_regimens([drug_list], k)[0]
+
+    def query_regimens(self, regimens, k):
+        """query_regimen for many regimens at once, with a single query for all their pairs."""
+        pairs_per_regimen = [regimen_pairs(drug_list) for drug_list in regimens]
+        risks = self.query_pairs([pair for pairs in pairs_per_regimen for pair in pairs], k)
+        return [{(d1, d2): [(d1, d2, condition, prr) for condition, prr in risks[(d1, d2)]]
+                 for d1, d2 in pairs if risks[(d1, d2)]}
+                for pairs in pairs_per_regimen]
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache),
+                "max_size": self.cache_size, "round_trips": self.round_trips}
+
+# Example usage
+if __name__ == "__main__":
+    with RiskQueryClient(model="bidirectional") as client:
+        user_drugs = ["Temazepam", "sildenafil", "Prednisone", "Cyclophosphamide", "zopiclone"]
+        risks = client.query_regimen(user_drugs, 5)
+        for (drug1, drug2), interactions in risks.items():
+            print(f"\n{drug1} + {drug2}:")
+            for idx, (_, _, condition, prr) in enumerate(interactions, 1):
+                print(f"  {idx}. {drug1} + {drug2} → {condition} (PRR: {prr})")
+        print(client.cache_info())
@@ -2,50 +2,104 @@ import networkx as nx
 import json
 import os
 
-def insert_hyperfacts_to_multigraph(input_json, output_path):
+from fact_store import is_columnar_store, load_hyperfact_store
+from condition_index import load_conditions, write_condition_index
+from fact_table import FactTable
+from graph_snapshot import build_multigraph, save_graph_snapshot
+from pair_index import write_pair_index
+
+# Conditions kept per drug pair in the pair index written next to the graph
+# (None keeps them all). Queries for up to this many conditions per pair are
+# answered from the index.
+PAIR_INDEX_MAX_K = 100
+
+def insert_hyperfacts_to_multigraph(input_json, output_path, max_k=PAIR_INDEX_MAX_K, snapshot=False):
     """
     Reads a JSON file containing hyperfacts and inserts them into a NetworkX MultiGraph.
-    Saves the graph in JSON format at the specified output path.
+    Saves the graph in JSON format at the specified output path, together with a
+    pair index (output_path/pair_index/, see pair_index.py) holding each drug
+    pair's conditions sorted by PRR, so queries only need to slice them, and a
+    condition index (output_path/condition_index/, see condition_index.py) holding
+    each condition's drug pairs sorted by PRR, for reverse lookups. The condition
+    index covers the conditions in the conditions.json next to input_json, if any.
     
-    :param input_json: Path to the input hyperfacts JSON file.
+    :param input_json: Path to the input hyperfacts JSON file, or to a columnar
+                       hyperfacts store directory (see fact_store.py).
     :param output_path: Path to save the generated graph JSON file.
+    :param max_k: Conditions kept per pair in the pair index (None keeps all).
+    :param snapshot: Also save a binary snapshot (polypharmacy_multigraph.npz,
+                     see graph_snapshot.py), which loads much faster than the JSON.
     """
     # Ensure output directory exists
     os.makedirs(output_path, exist_ok=True)
 
-    # Load hyperfacts from JSON file
-    with open(input_json, "r") as f:
-        hyperfacts = json.load(f)
-
-    # Create a MultiGraph (allows multiple edges between nodes)
-    G = nx.MultiGraph()
-
-    # Insert hyperfacts into the graph
-    for fact in hyperfacts:
-        drug1 = fact["drug1"]
-        drug2 = fact["drug2"]
-        adverse_event = fact["attributes"]["adverseEvent"]
-        prr_value = fact["attributes"]["PRR"]
+    # Build the MultiGraph (allows multiple edges between nodes) in one pass
+    # over the fact columns
+    if is_columnar_store(input_json):
+        # Columnar store: decode the ID columns into names, leaving out facts with
+        # a missing drug or condition (as FactTable does)
+        store = load_hyperfact_store(input_json)
+        known = store.known()
+        G = build_multigraph(store.names("drug1")[known], store.names("drug2")[known],
+                             store.names("adverse_event")[known], store.prr[known])
+        table = FactTable.from_store(store)
+    else:
+        # Load hyperfacts from JSON file
+        with open(input_json, "r") as f:
+            hyperfacts = json.load(f)
+        G = build_multigraph([fact["drug1"] for fact in hyperfacts],
+                             [fact["drug2"] for fact in hyperfacts],
+                             [fact["attributes"]["adverseEvent"] for fact in hyperfacts],
+                             [fact["attributes"]["PRR"] for fact in hyperfacts])
+        table = FactTable.from_hyperfacts(hyperfacts)
 
-        # Add multiple edges for the same pair (preserves all conditions)
-        G.add_edge(drug1, drug2, adverseEvent=adverse_event, PRR=prr_value)
+    save_multigraph(G, output_path)
+    if snapshot:
+        save_multigraph_snapshot(G, output_path)
+    save_pair_index(table, output_path, max_k)
+    conditions_json = os.path.join(os.path.dirname(os.path.normpath(input_json)), "conditions.json")
+    save_condition_index(table, output_path, load_conditions(conditions_json) if os.path.exists(conditions_json) else None)
 
+def save_multigraph(G, output_path):
+    """Saves the MultiGraph as node-link JSON in output_path."""
     # Define output file path
     output_json_file = os.path.join(output_path, "polypharmacy_multigraph.json")
 
-    # Save the graph in JSON format
+    # Save the graph in JSON format (via a temporary file, so a running
+    # query engine never reloads a half-written graph)
     data = nx.node_link_data(G)
-    with open(output_json_file, "w") as f:
+    with open(output_json_file + ".tmp", "w") as f:
         json.dump(data, f, indent=4)
+    os.replace(output_json_file + ".tmp", output_json_file)
     
     print(f"Graph saved at: {output_json_file}")
 
+def save_multigraph_snapshot(G, output_path):
+    """Saves the MultiGraph as a binary snapshot (polypharmacy_multigraph.npz) in output_path."""
+    output_snapshot_file = os.path.join(output_path, "polypharmacy_multigraph.npz")
+    save_graph_snapshot(G, output_snapshot_file)
+    print(f"Graph snapshot saved at: {output_snapshot_file}")
+
+def save_pair_index(table, output_path, max_k=PAIR_INDEX_MAX_K):
+    """Saves the per-pair PRR-sorted condition index of a FactTable in output_path/pair_index/."""
+    index_path = os.path.join(output_path, "pair_index")
+    write_pair_index(table, index_path, max_k)
+    print(f"Pair index (max_k={max_k}) saved at: {index_path}")
+
+def save_condition_index(table, output_path, conditions=None):
+    """Saves the per-condition PRR-sorted drug pair index of a FactTable in output_path/condition_index/."""
+    index_path = os.path.join(output_path, "condition_index")
+    write_condition_index(table, index_path, conditions)
+    print(f"Condition index saved at: {index_path}")
+
 # Example usage
 if __name__ == "__main__":
     # input_json_path = "./output/test/hyperfacts.json"  # Change this to your input file path
     # output_directory = "./output/test/graph/"  # Change this to your desired output directory
 
     input_json_path = "./output/split_raw_twosides/hyperfacts.json"  # Change this to your input file path
+    # input_json_path = "./output/split_raw_twosides/hyperfacts"  # or the columnar store
     output_directory = "./output/split_raw_twosides/graph/"  # Change this to your desired output directory
 
     insert_hyperfacts_to_multigraph(input_json_path, output_directory)
+    # insert_hyperfacts_to_multigraph(input_json_path, output_directory, snapshot=True)  # + binary snapshot
@@ -0,0 +1,211 @@
+import time
+import numpy as np
+
+import column_files
+from fact_table import FactTable, load_fact_table, merge_top_k, regimen_pairs
+
+# On-disk layout of a pair index (a directory, e.g. output/test/pair_index/):
+#   meta.json          - format name/version, sizes and column dtypes
+#   entities.json      - entity names; drugs and conditions are indices into this list
+#   drug_offsets.bin   - neighbours of drug d are neighbors[drug_offsets[d]:drug_offsets[d + 1]]
+#   neighbors.bin      - neighbour drug IDs, sorted within each drug
+#   pair_offsets.bin   - records of the i-th (drug, neighbour) pair are
+#                        records[pair_offsets[i]:pair_offsets[i + 1]]
+#   conditions.bin, prr.bin - the (condition, PRR) records, by descending PRR within each pair
+#                        (at most meta["max_k"] per pair, if set)
+# Every fact is listed under both of its drugs, so a lookup never has to check
+# the reverse direction. The files follow column_files.py: the columns are
+# memory-mapped when loading, so opening an index reads only meta.json and
+# entities.json, and a lookup touches only the pages it needs.
+INDEX_FORMAT = "polypharmacy-pair-index"
+INDEX_VERSION = 1
+INDEX_DTYPES = {
+    "drug_offsets": "<i8",
+    "neighbors": "<i4",
+    "pair_offsets": "<i8",
+    "conditions": "<i4",
+    "prr": "<f4",
+}
+
+def write_pair_index(table, path, max_k=None):
+    """
+    Writes the pair index of a FactTable (see fact_table.py) to the directory `path`.
+    With max_k, only the max_k highest-PRR records of each pair are kept, which
+    bounds the index size; queries for k <= max_k are still exact.
+    """
+    column_files.begin_write(path)
+
+    # The table's by-drug layout is already sorted by (drug, partner, -PRR);
+    # each run of equal (drug, partner) is one pair.
+    num_entities = len(table.entity_names)
+    source = np.repeat(np.arange(num_entities, dtype=np.int32), np.diff(table.drug_offsets))
+    new_pair = np.ones(len(source), dtype=bool)
+    new_pair[1:] = (source[1:] != source[:-1]) | (table.partner[1:] != table.partner[:-1])
+    pair_starts = np.flatnonzero(new_pair)
+    pair_offsets = np.append(pair_starts, len(source))
+    conditions, prr = table.condition, table.prr
+    if max_k is not None:
+        # Keep the first max_k records (the highest PRRs) of every pair
+        counts = np.diff(pair_offsets)
+        rank = np.arange(len(source)) - np.repeat(pair_starts, counts)
+        keep = rank < max_k
+        conditions, prr = conditions[keep], prr[keep]
+        pair_offsets = np.zeros(len(pair_starts) + 1, dtype=np.int64)
+        np.cumsum(np.minimum(counts, max_k), out=pair_offsets[1:])
+
+    columns = {
+        "drug_offsets": np.searchsorted(pair_starts, table.drug_offsets),
+        "neighbors": table.partner[pair_starts],
+        "pair_offsets": pair_offsets,
+        "conditions": conditions,
+        "prr": prr,
+    }
+    column_files.write_columns(path, columns, INDEX_DTYPES)
+    column_files.write_json(path, "entities", table.entity_names.tolist())
+
+    meta = {
+        "format": INDEX_FORMAT,
+        "version": INDEX_VERSION,
+        "num_entities": num_entities,
+        "num_pairs": len(pair_starts),
+        "num_records": len(conditions),
+        "max_k": max_k,
+        "columns": INDEX_DTYPES,
+    }
+    column_files.write_meta(path, meta)
+
+class PairIndex:
+    """
+    A memory-mapped pair index written by write_pair_index. Nothing but the
+    entity names is read up front; pair lookups binary-search the mapped arrays.
+    """
+    def __init__(self, path):
+        meta = column_files.read_meta(path, "pair index", INDEX_FORMAT, INDEX_VERSION)
+        self.path = path
+        self.max_k = meta.get("max_k")  # None: every record of every pair
+        self.entity_names = np.array(column_files.read_json(path, "entities"), dtype=object)
+        self.name2id = {name: i for i, name in enumerate(self.entity_names.tolist())}
+
+        sizes = {
+            "drug_offsets": meta["num_entities"] + 1,
+            "neighbors": meta["num_pairs"],
+            "pair_offsets": meta["num_pairs"] + 1,
+            "conditions": meta["num_records"],
+            "prr": meta["num_records"],
+        }
+        for name, values in column_files.map_columns(path, meta["columns"], sizes).items():
+            setattr(self, name, values)
+
+    def pair_records(self, drug_a, drug_b):
+        """
+        (conditions, prr) views of the facts between two drugs, in descending PRR
+        order (only the top max_k if the index was built with one).
+        """
+        a, b = self.name2id.get(drug_a, -1), self.name2id.get(drug_b, -1)
+        if a < 0 or b < 0:
+            return self.conditions[:0], self.prr[:0]
+        start, stop = self.drug_offsets[a], self.drug_offsets[a + 1]
+        i = start + np.searchsorted(self.neighbors[start:stop], b)
+        if i == stop or self.neighbors[i] != b:
+            return self.conditions[:0], self.prr[:0]
+        lo, hi = self.pair_offsets[i], self.pair_offsets[i + 1]
+        return self.conditions[lo:hi], self.prr[lo:hi]
+
+    def pair_ranges(self, drugs_a, drugs_b):
+        """
+        Vectorized pair_records for many pairs at once: arrays (lo, hi) such that the
+        records of (drugs_a[i], drugs_b[i]) are conditions/prr[lo[i]:hi[i]]. Drugs
+        are entity IDs (see name2id); pairs with an unknown (-1) drug or without
+        facts get an empty range. All pairs are binary-searched together, in about
+        log2(max neighbours) numpy steps instead of one search per pair.
+        """
+        a = np.asarray(drugs_a, dtype=np.int64)
+        b = np.asarray(drugs_b, dtype=np.int64)
+        valid = (a >= 0) & (b >= 0)
+        a = np.where(valid, a, 0)
+        lo = np.where(valid, self.drug_offsets[a], 0)
+        hi = np.where(valid, self.drug_offsets[a + 1], 0)
+        block_end = hi
+        last = max(len(self.neighbors) - 1, 0)
+        active = lo < hi
+        while active.any():
+            mid = (lo + hi) // 2
+            right = self.neighbors[np.minimum(mid, last)] < b
+            lo = np.where(active & right, mid + 1, lo)
+            hi = np.where(active & ~right, mid, hi)
+            active = lo < hi
+        found = lo < block_end
+        found[found] = self.neighbors[lo[found]] == b[found]
+        i = np.where(found, lo, 0)
+        return np.where(found, self.pair_offsets[i], 0), np.where(found, self.pair_offsets[i + 1], 0)
+
+    def query(self, drug_list, k):
+        """
+        Top-k highest-PRR interactions for each pair of drugs in drug_list, in the
+        same form as networkx_query's query_polypharmacy_risk:
+        {(d1, d2): [(d1, d2, condition, PRR), ...]} with d1 < d2.
+        k must not exceed the index's max_k, if it has one.
+        """
+        if self.max_k is not None and k > self.max_k:
+            raise ValueError(f"k={k} exceeds the max_k={self.max_k} this index was built with.")
+        results = {}
+        for d1, d2 in regimen_pairs(drug_list):
+            conditions, prrs = self.pair_records(d1, d2)
+            if len(conditions):
+                results[(d1, d2)] = [(d1, d2, condition, prr) for condition, prr in
+                                     zip(self.entity_names[conditions[:k]].tolist(),
+                                         FactTable.prr_list(prrs[:k]))]
+        return results
+
+    def query_regimen_top_k(self, drug_list, k):
+        """
+        The k riskiest interactions across the whole regimen, as a list of
+        (d1, d2, condition, PRR) by descending PRR. Each unordered pair of distinct
+        drugs is looked up once and its PRR-sorted records are merged through a
+        bounded heap (see fact_table.merge_top_k). k must not exceed max_k, if set.
+        """
+        if self.max_k is not None and k > self.max_k:
+            raise ValueError(f"k={k} exceeds the max_k={self.max_k} this index was built with.")
+        pairs = regimen_pairs(drug_list)
+        records = [self.pair_records(d1, d2) for d1, d2 in pairs]
+        picks = merge_top_k([prrs for _, prrs in records], k)
+        conditions = self.entity_names[np.array([records[i][0][pos] for i, pos in picks], dtype=np.int64)].tolist()
+        prrs = FactTable.prr_list(np.array([records[i][1][pos] for i, pos in picks], dtype=np.float32))
+        return [(*pairs[i], condition, prr) for (i, _), condition, prr in zip(picks, conditions, prrs)]
+
+def is_pair_index(path):
+    """True if `path` is a complete pair index directory."""
+    return column_files.is_complete(path)
+
+def load_pair_index(path):
+    """Opens a pair index written by write_pair_index."""
+    return PairIndex(path)
+
+def build_pair_index(input_path, output_path, max_k=None):
+    """
+    Builds a pair index from hyperfacts.json or a columnar hyperfacts store.
+
+    :param input_path: Path to hyperfacts.json or the columnar store directory.
+    :param output_path: Directory to write the index to.
+    :param max_k: Keep only the top max_k records per pair (None keeps all).
+    """
+    table = load_fact_table(input_path)
+    write_pair_index(table, output_path, max_k)
+    print(f"Pair index for {len(table)} facts saved at: {output_path}")
+
+# Example usage
+if __name__ == "__main__":
+    input_path = "./output/test/hyperfacts"  # hyperfacts.json or the columnar store
+    index_path = "./output/test/pair_index/"
+
+    build_pair_index(input_path, index_path)
+
+    # Cold start: open the index and answer one regimen lookup
+    start = time.perf_counter()
+    index = load_pair_index(index_path)
+    risks = index.query(["Temazepam", "sildenafil", "Prednisone", "Cyclophosphamide", "zopiclone"], 5)
+    print(f"Opened the index and answered the query in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for (drug1, drug2), interactions in risks.items():
+        print(f"\n{drug1} + {drug2}:")
+        for idx, (_, _, condition, prr) in enumerate(interactions, 1):
+            print(f"  {idx}. {drug1} + {drug2} → {condition} (PRR: {prr})")
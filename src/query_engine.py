@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import heapq
+import threading
+from collections import deque
+import numpy as np
+import networkx as nx
+
+from condition_index import is_condition_index, load_condition_index
+from fact_table import regimen_pairs
+from graph_snapshot import is_graph_snapshot, load_graph_snapshot
+from pair_index import is_pair_index, load_pair_index
+
+# Recent query latencies kept for latency_stats()
+LATENCY_WINDOW = 10_000
+
+def load_multigraph(graph_json_path):
+    """
+    Loads the saved MultiGraph from a JSON file, or from a binary snapshot
+    (polypharmacy_multigraph.npz, see graph_snapshot.py).
+
+    :param graph_json_path: Path to the saved graph JSON file (or .npz snapshot).
+    :return: NetworkX MultiGraph object.
+    """
+    if is_graph_snapshot(graph_json_path):
+        return load_graph_snapshot(graph_json_path)
+    with open(graph_json_path, "r") as f:
+        data = json.load(f)
+    return nx.node_link_graph(data)
+
+def query_graph(G, drug_list, k):
+    """
+    Top-k highest-risk polypharmacy interactions for each drug pair of drug_list,
+    answered from an already loaded MultiGraph.
+
+    :return: Dictionary with drug pairs as keys and top-k interactions as values.
+    """
+    results = {}
+
+    # Find interactions within the user's drug list (each unordered pair once)
+    for d1, d2 in regimen_pairs(drug_list):
+        if G.has_edge(d1, d2):
+            pair_results = []
+
+            # Iterate through all hyper-relations between (d1, d2)
+            for _, edge_data in G.get_edge_data(d1, d2).items():
+                pair_results.append((d1, d2, edge_data["adverseEvent"], edge_data["PRR"]))
+
+            # Sort by PRR in descending order and take the top k
+            pair_results = sorted(pair_results, key=lambda x: x[3], reverse=True)[:k]
+
+            if pair_results:
+                results[(d1, d2)] = pair_results
+
+    return results
+
+def query_graph_regimen_top_k(G, drug_list, k):
+    """
+    The k riskiest interactions across all pairs of drug_list, as a list of
+    (d1, d2, condition, PRR) by descending PRR, from an already loaded MultiGraph.
+    Edges are streamed through a heap of size k rather than sorted.
+    """
+    edges = ((d1, d2, edge_data["adverseEvent"], edge_data["PRR"])
+             for d1, d2 in regimen_pairs(drug_list) if G.has_edge(d1, d2)
+             for edge_data in G.get_edge_data(d1, d2).values())
+    return heapq.nlargest(k, edges, key=lambda x: x[3])
+
+def query_graph_condition(G, condition, k=None, min_prr=None):
+    """
+    The drug pairs with the highest PRR for `condition`, as a list of
+    (d1, d2, condition, PRR) by descending PRR, from an already loaded MultiGraph.
+    This scans every edge; a condition index answers it without the scan.
+    """
+    edges = [(d1, d2, condition, edge_data["PRR"]) if d1 < d2 else (d2, d1, condition, edge_data["PRR"])
+             for d1, d2, edge_data in G.edges(data=True)
+             if edge_data["adverseEvent"] == condition and (min_prr is None or edge_data["PRR"] >= min_prr)]
+    edges.sort(key=lambda x: x[3], reverse=True)
+    return edges if k is None else edges[:k]
+
+class GraphQueryEngine:
+    """
+    Long-lived risk query engine over a saved MultiGraph. The graph is loaded
+    once and reused by every query. Before each query the engine checks (with
+    one stat call) whether the graph file has changed, and reloads it if so.
+    If reloading fails, for example because the file is only half written, the
+    engine keeps answering from the graph it already has. Safe to share between
+    threads.
+
+    If the graph was saved with a pair index (networkx_insert writes one to
+    pair_index/ next to the graph), queries for k up to the index's max_k are
+    answered by slicing its PRR-sorted per-pair lists instead of sorting edges.
+    Likewise, reverse lookups by condition use the condition index in
+    condition_index/ when there is one.
+    """
+    def __init__(self, graph_json_path, auto_reload=True, pair_index_path=None, condition_index_path=None):
+        self.graph_json_path = graph_json_path
+        self.pair_index_path = pair_index_path or os.path.join(os.path.dirname(graph_json_path), "pair_index")
+        self.condition_index_path = (condition_index_path or
+                                     os.path.join(os.path.dirname(graph_json_path), "condition_index"))
+        self.auto_reload = auto_reload
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.num_queries = 0
+        self.num_reloads = 0
+        self.G = None
+        self.pair_index = None
+        self.condition_index = None
+        self.file_version = None  # (mtime, size) of the files last loaded or tried
+        self.reload()
+
+    def _stat_version(self):
+        stat = os.stat(self.graph_json_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        for index_path in (self.pair_index_path, self.condition_index_path):
+            meta_path = os.path.join(index_path, "meta.json")
+            version += (os.stat(meta_path).st_mtime_ns if os.path.exists(meta_path) else None,)
+        return version
+
+    def reload(self):
+        """(Re)loads the graph file; returns True if a new graph was loaded."""
+        version = self._stat_version()
+        start = time.perf_counter()
+        try:
+            G = load_multigraph(self.graph_json_path)
+            pair_index = load_pair_index(self.pair_index_path) if is_pair_index(self.pair_index_path) else None
+            condition_index = (load_condition_index(self.condition_index_path)
+                               if is_condition_index(self.condition_index_path) else None)
+        except (OSError, ValueError, KeyError, nx.NetworkXError) as e:
+            if self.G is None:
+                raise
+            print(f"Reloading '{self.graph_json_path}' failed, keeping the current graph: {e}")
+            self.file_version = version  # retry only once the file changes again
+            return False
+        with self.lock:
+            self.G = G
+            self.pair_index = pair_index
+            self.condition_index = condition_index
+            self.file_version = version
+            self.num_reloads += 1
+        print(f"Loaded graph from '{self.graph_json_path}' in {time.perf_counter() - start:.2f}s "
+              f"({G.number_of_nodes()} nodes, {G.number_of_edges()} edges).")
+        return True
+
+    def reload_if_changed(self):
+        """Reloads the graph if its file changed since it was loaded."""
+        try:
+            changed = self._stat_version() != self.file_version
+        except OSError:
+            return False  # file being replaced; try again on the next query
+        return self.reload() if changed else False
+
+    def _timed(self, fn):
+        """Runs one query, after an auto-reload check, recording its latency."""
+        if self.auto_reload:
+            self.reload_if_changed()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies.append(elapsed)
+            self.num_queries += 1
+        return result
+
+    def query(self, drug_list, k):
+        """
+        Top-k highest-risk interactions for each drug pair, as query_polypharmacy_risk:
+        {(d1, d2): [(d1, d2, condition, PRR), ...]}.
+        """
+        def run():
+            pair_index = self.pair_index
+            if pair_index is not None and (pair_index.max_k is None or k <= pair_index.max_k):
+                return pair_index.query(drug_list, k)
+            return query_graph(self.G, drug_list, k)
+        return self._timed(run)
+
+    def query_regimen(self, drug_list, k):
+        """
+        The k riskiest interactions across the whole regimen (not per pair), as a
+        list of (d1, d2, condition, PRR) by descending PRR. Repeated drugs are
+        ignored and each unordered pair is looked up once; with a pair index the
+        per-pair PRR-sorted lists are heap-merged and the merge stops after k.
+        """
+        def run():
+            pair_index = self.pair_index
+            if pair_index is not None and (pair_index.max_k is None or k <= pair_index.max_k):
+                return pair_index.query_regimen_top_k(drug_list, k)
+            return query_graph_regimen_top_k(self.G, drug_list, k)
+        return self._timed(run)
+
+    def query_condition(self, condition, k=None, min_prr=None):
+        """
+        The drug pairs with the highest PRR for `condition`, as a list of
+        (d1, d2, condition, PRR) by descending PRR: at most k, with PRR >= min_prr.
+        """
+        def run():
+            condition_index = self.condition_index
+            if condition_index is not None:
+                return condition_index.query(condition, k, min_prr)
+            return query_graph_condition(self.G, condition, k, min_prr)
+        return self._timed(run)
+
+    def latency_stats(self):
+        """Latency of the most recent queries (up to LATENCY_WINDOW), in milliseconds."""
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            num_queries, num_reloads = self.num_queries, self.num_reloads
+        stats = {"queries": num_queries, "reloads": num_reloads}
+        if len(latencies):
+            stats.update({
+                "mean_ms": float(latencies.mean()),
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+                "p99_ms": float(np.percentile(latencies, 99)),
+                "max_ms": float(latencies.max()),
+            })
+        return stats
+
+# Example usage
+if __name__ == "__main__":
+    engine = GraphQueryEngine("./output/test/graph/polypharmacy_multigraph.json")
+    user_drugs = ["Temazepam", "sildenafil", "Prednisone", "Cyclophosphamide", "zopiclone"]
+    for _ in range(100):
+        risks = engine.query(user_drugs, 5)
+    print(engine.latency_stats())
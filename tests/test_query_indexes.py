@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from batch_screen import RegimenScreener, screen_regimens
+from condition_index import load_condition_index, write_condition_index
+from fact_table import FactTable
+from graph_snapshot import build_multigraph
+from pair_index import load_pair_index, write_pair_index
+from query_engine import query_graph, query_graph_condition, query_graph_regimen_top_k
+
+# Hand-written facts in the hyperfacts.json format. They include PRR ties within
+# a pair (also across the two directions of a pair) and across pairs, a pair
+# stored in both directions and a self-pair.
+FACTS = [
+    ("Aspirin", "Bupropion", "Headache", 3.5),
+    ("Aspirin", "Bupropion", "Nausea", 2.0),
+    ("Bupropion", "Aspirin", "Fatigue", 2.0),
+    ("Aspirin", "Bupropion", "Rash", 2.0),
+    ("Aspirin", "Bupropion", "Dizziness", 1.25),
+    ("Aspirin", "Codeine", "Headache", 2.0),
+    ("Codeine", "Aspirin", "Nausea", 5.0),
+    ("Bupropion", "Codeine", "Rash", 3.5),
+    ("Codeine", "Diazepam", "Headache", 1.0),
+    ("Diazepam", "Aspirin", "Rash", 2.0),
+    ("Diazepam", "Diazepam", "Fatigue", 4.75),
+]
+
+CONDITIONS = ["Headache", "Nausea", "Fatigue", "Rash", "Dizziness", "Insomnia"]
+
+REGIMENS = [
+    ["Aspirin", "Bupropion", "Codeine", "Diazepam"],
+    ["Bupropion", "Aspirin", "Bupropion"],  # a repeated drug
+    ["Aspirin", "Warfarin", "Codeine"],  # an unknown drug
+    ["Warfarin", "Ibuprofen"],  # only unknown drugs
+    ["Diazepam"],
+    [],
+]
+
+def hyperfacts(facts):
+    return [{"drug1": d1, "relation": "interactWith", "drug2": d2,
+             "attributes": {"adverseEvent": condition, "PRR": prr}} for d1, d2, condition, prr in facts]
+
+@pytest.fixture(scope="module")
+def graph():
+    d1, d2, conditions, prrs = zip(*FACTS)
+    return build_multigraph(list(d1), list(d2), list(conditions), list(prrs))
+
+@pytest.fixture(scope="module")
+def table():
+    return FactTable.from_hyperfacts(hyperfacts(FACTS))
+
+@pytest.fixture(scope="module")
+def pair_index(table, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pair_index"))
+    write_pair_index(table, path)
+    return load_pair_index(path)
+
+@pytest.fixture(scope="module")
+def truncated_pair_index(table, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pair_index_max_k"))
+    write_pair_index(table, path, max_k=2)
+    return load_pair_index(path)
+
+@pytest.fixture(scope="module")
+def condition_index(table, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("condition_index"))
+    write_condition_index(table, path, CONDITIONS)
+    return load_condition_index(path)
+
+def assert_same_ranking(got, expected):
+    """
+    Rows in the same descending PRR order. Rows with equal PRRs may come in any
+    order, and a top k may cut such a run of ties at any of its rows.
+    """
+    assert [row[3] for row in got] == [row[3] for row in expected]
+    by_prr = {}
+    for row in expected:
+        by_prr.setdefault(row[3], []).append(row)
+    for prr, rows in by_prr.items():
+        got_rows = [row for row in got if row[3] == prr]
+        assert all(row in rows for row in got_rows)
+        assert len(set(got_rows)) == len(got_rows)
+
+@pytest.mark.parametrize("k", [1, 2, 3, 10])
+@pytest.mark.parametrize("drugs", REGIMENS)
+def test_pair_index_query_matches_graph(graph, pair_index, drugs, k):
+    assert pair_index.query(drugs, k) == query_graph(graph, drugs, k)
+
+@pytest.mark.parametrize("k", [1, 2])
+@pytest.mark.parametrize("drugs", REGIMENS)
+def test_truncated_pair_index_query_matches_graph(graph, truncated_pair_index, drugs, k):
+    assert truncated_pair_index.query(drugs, k) == query_graph(graph, drugs, k)
+
+def test_truncated_pair_index_rejects_larger_k(truncated_pair_index):
+    with pytest.raises(ValueError):
+        truncated_pair_index.query(REGIMENS[0], 3)
+    with pytest.raises(ValueError):
+        truncated_pair_index.query_regimen_top_k(REGIMENS[0], 3)
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5, 10, 100])
+@pytest.mark.parametrize("drugs", REGIMENS)
+def test_regimen_top_k_matches_graph(graph, pair_index, table, drugs, k):
+    expected = query_graph_regimen_top_k(graph, drugs, k)
+    assert pair_index.query_regimen_top_k(drugs, k) == expected
+    assert table.regimen_top_k(drugs, k) == expected
+
+@pytest.mark.parametrize("k", [1, 2])
+@pytest.mark.parametrize("drugs", REGIMENS)
+def test_truncated_regimen_top_k_matches_graph(graph, truncated_pair_index, drugs, k):
+    assert truncated_pair_index.query_regimen_top_k(drugs, k) == query_graph_regimen_top_k(graph, drugs, k)
+
+@pytest.mark.parametrize("min_prr", [None, 2.0, 3.6])
+@pytest.mark.parametrize("k", [None, 1, 2, 3])
+@pytest.mark.parametrize("condition", CONDITIONS + ["Unknown condition"])
+def test_condition_index_query_matches_graph(graph, condition_index, condition, k, min_prr):
+    # The graph scan lists tied pairs in edge order, the index in fact order
+    assert_same_ranking(condition_index.query(condition, k, min_prr),
+                        query_graph_condition(graph, condition, k, min_prr))
+
+@pytest.mark.parametrize("min_prr", [None, 2.0])
+@pytest.mark.parametrize("k", [None, 2])
+def test_condition_index_sweep_matches_query(condition_index, k, min_prr):
+    expected = {condition: condition_index.query(condition, k, min_prr) for condition in CONDITIONS}
+    assert condition_index.sweep(k, min_prr) == {condition: rows for condition, rows in expected.items() if rows}
+
+@pytest.mark.parametrize("k", [1, 2, 3])
+def test_screen_regimens_matches_graph(graph, pair_index, tmp_path, k):
+    output_path = str(tmp_path / "risks.ndjson")
+    regimens = [(f"patient-{i}", drugs) for i, drugs in enumerate(REGIMENS)]
+    stats = screen_regimens(regimens, pair_index.path, output_path, k=k, workers=1, chunk_size=2)
+    assert stats["regimens"] == len(REGIMENS)
+    with open(output_path, "r") as f:
+        results = [json.loads(line) for line in f]
+    assert [result["id"] for result in results] == [regimen_id for regimen_id, _ in regimens]
+    for result, (_, drugs) in zip(results, regimens):
+        expected = [row for rows in query_graph(graph, drugs, k).values() for row in rows]
+        got = [(row["drug1"], row["drug2"], row["condition"], row["PRR"]) for row in result["interactions"]]
+        assert got == expected
+
+def test_screener_rejects_k_above_max_k(truncated_pair_index):
+    with pytest.raises(ValueError):
+        RegimenScreener(truncated_pair_index.path, 3)